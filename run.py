@@ -5,34 +5,48 @@ Entry point script for Render deployment.
 
 import os
 import sys
+import logging
 import subprocess
 import http.server
 import threading
 
+logger = logging.getLogger(__name__)
+
+def _http_response(status, body):
+    """Pre-serialize a complete HTTP/1.1 JSON response."""
+    return (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"\r\n"
+    ).encode("ascii") + body
+
+# Fixed health-check responses, each sent with a single write
+HEALTHY_RESPONSE = _http_response("200 OK", b'{"status": "healthy"}')
+NOT_FOUND_RESPONSE = _http_response("404 Not Found", b'{"status": "not found"}')
+
 def add_http_server():
     """Add a simple HTTP server for health checks."""
     # Get port from environment or use default
     port = int(os.environ.get("PORT", 10000))
     
     class HealthCheckHandler(http.server.BaseHTTPRequestHandler):
+        # Keep probe connections alive between requests
+        protocol_version = "HTTP/1.1"
+        
         def do_GET(self):
             if self.path == "/health" or self.path == "/":
-                self.send_response(200)
-                self.send_header("Content-type", "application/json")
-                self.end_headers()
-                self.wfile.write(b'{"status": "healthy"}')
+                self.wfile.write(HEALTHY_RESPONSE)
             else:
-                self.send_response(404)
-                self.end_headers()
-                self.wfile.write(b'{"status": "not found"}')
+                self.wfile.write(NOT_FOUND_RESPONSE)
         
         # Silence log messages
         def log_message(self, format, *args):
             return
     
     def run_server():
-        server = http.server.HTTPServer(("0.0.0.0", port), HealthCheckHandler)
-        print(f"Starting HTTP server on port {port}")
+        server = http.server.ThreadingHTTPServer(("0.0.0.0", port), HealthCheckHandler)
+        logger.info(f"Starting HTTP server on port {port}")
         server.serve_forever()
     
     # Start HTTP server in a separate thread
@@ -42,30 +56,39 @@ def add_http_server():
 
 def main():
     """Run the main application."""
-    print("Starting Google Drive Sync application...")
+    # Boot messages are only shown when DEBUG_BOOT is set
+    logging.basicConfig(
+        level=logging.INFO if os.environ.get("DEBUG_BOOT") else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.info("Starting Google Drive Sync application...")
+    
+    # Start HTTP server for health checks before any configuration work so
+    # Render's readiness probe is answered during startup
+    http_server_thread = add_http_server()
     
     # Add the current directory to the Python path
     sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
     
-    # Start HTTP server for health checks
-    http_server_thread = add_http_server()
-    
     # Set up configuration
-    print("Setting up configuration...")
+    logger.info("Setting up configuration...")
     from setup_config import setup_config
     setup_config()
     
-    # Print current directory and list files for debugging
-    print(f"Current directory: {os.getcwd()}")
-    print("Files in current directory:")
-    for item in os.listdir("."):
-        print(f"  {item}")
-    print("Files in config directory:")
-    for item in os.listdir("config"):
-        print(f"  {item}")
+    # Log current directory and list files for debugging
+    if os.environ.get("DEBUG_BOOT"):
+        logger.info(f"Current directory: {os.getcwd()}")
+        logger.info("Files in current directory:")
+        with os.scandir(".") as entries:
+            for entry in entries:
+                logger.info(f"  {entry.name}")
+        logger.info("Files in config directory:")
+        with os.scandir("config") as entries:
+            for entry in entries:
+                logger.info(f"  {entry.name}")
     
     # Run the main module
-    print("Running main application...")
+    logger.info("Running main application...")
     from src.main import main
     main()
 
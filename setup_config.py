@@ -5,13 +5,23 @@ This script creates a config.yaml file from environment variables.
 """
 
 import os
-import json
-import yaml
+import logging
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 def setup_config():
     """Create config.yaml file from environment variables."""
-    print("Setting up configuration for Render deployment...")
+    # Imported here so run.py's health-check server is up before they load
+    import json
+    import hashlib
+    import yaml
+    try:
+        from yaml import CSafeDumper as Dumper
+    except ImportError:
+        from yaml import SafeDumper as Dumper
+    
+    logger.info("Setting up configuration for Render deployment...")
     
     # Create config directory if it doesn't exist
     config_dir = Path("config")
@@ -44,27 +54,40 @@ def setup_config():
     
     # Write config to file
     with open(config_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False)
-    print(f"Created configuration file at {config_path}")
+        yaml.dump(config, f, Dumper=Dumper, default_flow_style=False)
+    logger.info(f"Created configuration file at {config_path}")
+    
+    # Write a JSON copy that Config loads faster than the YAML
+    with open(config_dir / "config.json", "w") as f:
+        json.dump(config, f)
     
-    # Create service account file if provided as environment variable
+    # Create service account file if provided as environment variable,
+    # skipping the write when the stored hash shows it is unchanged
     service_account_json = os.environ.get("GOOGLE_SERVICE_ACCOUNT_JSON")
     if service_account_json:
-        try:
-            service_account_data = json.loads(service_account_json)
-            service_account_path = Path("service_account.json")
-            with open(service_account_path, "w") as f:
-                json.dump(service_account_data, f, indent=2)
-            print(f"Created service account file at {service_account_path}")
-        except json.JSONDecodeError:
-            print("Error: Invalid service account JSON")
+        service_account_path = Path("service_account.json")
+        hash_path = Path("service_account.json.sha256")
+        digest = hashlib.sha256(service_account_json.encode()).hexdigest()
+        
+        if (service_account_path.exists() and hash_path.exists()
+                and hash_path.read_text().strip() == digest):
+            logger.info(f"Service account file at {service_account_path} is up to date")
+        else:
+            try:
+                service_account_data = json.loads(service_account_json)
+                with open(service_account_path, "w") as f:
+                    json.dump(service_account_data, f, indent=2)
+                hash_path.write_text(digest)
+                logger.info(f"Created service account file at {service_account_path}")
+            except json.JSONDecodeError:
+                logger.error("Invalid service account JSON")
     
     # Create necessary directories
-    Path("data").mkdir(exist_ok=True)
-    Path("data/downloads").mkdir(exist_ok=True)
+    Path("data/downloads").mkdir(parents=True, exist_ok=True)
     Path("logs").mkdir(exist_ok=True)
     
-    print("Configuration setup complete!")
+    logger.info("Configuration setup complete!")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     setup_config()
@@ -6,50 +6,191 @@ for tracking changes in Google Drive files.
 """
 
 import os
+import queue
+import time
 import sqlite3
 import logging
 import threading
 from pathlib import Path
-from datetime import datetime
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# Connection tuning applied once per new connection. WAL lets readers run
+# alongside a writer and, with synchronous=NORMAL, avoids an fsync per commit.
+CONNECTION_PRAGMAS = '''
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+    PRAGMA cache_size = -65536;
+'''
+
+# Attempts to start a write transaction while another connection holds the
+# write lock, and the initial backoff between attempts in seconds
+WRITE_LOCK_RETRIES = 5
+WRITE_LOCK_RETRY_DELAY = 0.05
+
+# Insert a new file or update the existing row in one statement.
+# New rows default to 'new', updated rows default to 'synced'.
+UPSERT_FILE_SQL = '''
+    INSERT INTO files (
+        id, name, parent_id, mime_type, modified_time,
+        size, md5_checksum, path, last_checked, status
+    ) VALUES (
+        :id, :name, :parent_id, :mime_type, :modified_time,
+        :size, :md5_checksum, :path, CURRENT_TIMESTAMP,
+        COALESCE(:status, 'new')
+    )
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        parent_id = excluded.parent_id,
+        mime_type = excluded.mime_type,
+        modified_time = excluded.modified_time,
+        size = excluded.size,
+        md5_checksum = excluded.md5_checksum,
+        path = excluded.path,
+        last_checked = excluded.last_checked,
+        status = COALESCE(:status, 'synced')
+'''
+
+ADD_HISTORY_SQL = '''
+    INSERT INTO sync_history (
+        file_id, action, timestamp, details
+    ) VALUES (?, ?, CURRENT_TIMESTAMP, ?)
+'''
+
+GET_FILE_SQL = "SELECT * FROM files WHERE id = ?"
+GET_FILES_BY_IDS_SQL = "SELECT * FROM files WHERE id IN ({placeholders})"
+GET_ALL_FILES_SQL = "SELECT * FROM files"
+GET_FILES_BY_STATUS_SQL = "SELECT * FROM files WHERE status = ?"
+UPDATE_FILE_STATUS_SQL = "UPDATE files SET status = ? WHERE id = ?"
+DELETE_FILE_SQL = "DELETE FROM files WHERE id = ?"
+GET_STATE_SQL = "SELECT value FROM sync_state WHERE key = ?"
+SET_STATE_SQL = "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)"
+
+# Maximum number of IDs bound in a single IN (...) query, below SQLite's
+# historical limit of 999 host parameters
+MAX_IN_QUERY_IDS = 500
+
+# Per-connection cache of compiled statements, keyed on SQL text
+CACHED_STATEMENTS = 256
+
 
 class DatabaseManager:
     """Thread-safe database manager for file metadata tracking."""
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, pool_size=5):
         """
         Initialize the database manager.
         
         Args:
             db_path (str or Path): Path to the SQLite database file.
+            pool_size (int): Maximum number of pooled database connections.
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._local = threading.local()
-        self._lock = threading.RLock()
+        self._pool_size = pool_size
+        self._pool = queue.Queue(maxsize=pool_size)
+        self._pool_lock = threading.Lock()
+        self._created_connections = 0
         
         # Initialize the database schema
-        with self._get_connection() as conn:
+        with self._connection() as conn:
             self._initialize_schema(conn)
     
-    def _get_connection(self):
+    def _create_connection(self):
         """
-        Get a thread-local database connection.
+        Open a new database connection.
         
         Returns:
-            sqlite3.Connection: A database connection for the current thread.
+            sqlite3.Connection: A configured database connection.
+        """
+        try:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                cached_statements=CACHED_STATEMENTS
+            )
+            conn.row_factory = sqlite3.Row
+            conn.executescript(CONNECTION_PRAGMAS)
+            logger.debug(f"Created new pooled database connection for {self.db_path}")
+            return conn
+        except sqlite3.Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    @contextmanager
+    def _connection(self):
         """
-        if not hasattr(self._local, 'conn') or self._local.conn is None:
+        Borrow a connection from the pool for the duration of a block.
+        
+        New connections are opened on demand until the pool size is reached,
+        after which callers wait for a connection to be returned. Any open
+        transaction is rolled back if the block raises.
+        
+        Yields:
+            sqlite3.Connection: A pooled database connection.
+        """
+        conn = None
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                if self._created_connections < self._pool_size:
+                    self._created_connections += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._create_connection()
+                except sqlite3.Error:
+                    with self._pool_lock:
+                        self._created_connections -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
             try:
-                self._local.conn = sqlite3.connect(self.db_path)
-                self._local.conn.row_factory = sqlite3.Row
-                logger.debug(f"Created new database connection for thread {threading.get_ident()}")
-            except sqlite3.Error as e:
-                logger.error(f"Database connection error: {e}")
-                raise
-        return self._local.conn
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    @contextmanager
+    def _write_transaction(self):
+        """
+        Borrow a connection and run the block in a write transaction.
+        
+        Writers are serialized by SQLite itself through BEGIN IMMEDIATE. If
+        another connection holds the write lock, starting the transaction is
+        retried with exponential backoff. The transaction is committed when
+        the block exits normally and rolled back if it raises.
+        
+        Yields:
+            sqlite3.Connection: A pooled database connection.
+        """
+        with self._connection() as conn:
+            delay = WRITE_LOCK_RETRY_DELAY
+            for attempt in range(WRITE_LOCK_RETRIES):
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    break
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e) or attempt == WRITE_LOCK_RETRIES - 1:
+                        raise
+                    logger.debug(f"Database locked, retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    delay *= 2
+            
+            yield conn
+            conn.commit()
     
     def _initialize_schema(self, conn):
         """
@@ -92,6 +233,23 @@ class DatabaseManager:
                 )
             ''')
             
+            # Create sync_state table for values kept between polls, such as
+            # the Drive changes page token
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            
+            # Create indexes for status lookups and history joins
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_files_status ON files (status)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sync_history_file_id ON sync_history (file_id)"
+            )
+            
             conn.commit()
             logger.info("Database schema initialized")
             return True
@@ -101,12 +259,18 @@ class DatabaseManager:
             return False
     
     def close(self):
-        """Close all database connections."""
-        with self._lock:
-            if hasattr(self._local, 'conn') and self._local.conn is not None:
-                self._local.conn.close()
-                self._local.conn = None
-                logger.debug(f"Closed database connection for thread {threading.get_ident()}")
+        """Close all pooled database connections."""
+        with self._pool_lock:
+            closed = 0
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                closed += 1
+            self._created_connections = max(0, self._created_connections - closed)
+            logger.debug(f"Closed {closed} pooled database connections")
     
     def initialize_db(self):
         """
@@ -116,7 +280,7 @@ class DatabaseManager:
             bool: True if initialization is successful, False otherwise.
         """
         try:
-            with self._get_connection() as conn:
+            with self._connection() as conn:
                 return self._initialize_schema(conn)
         except sqlite3.Error as e:
             logger.error(f"Error initializing database: {e}")
@@ -133,71 +297,72 @@ class DatabaseManager:
             bool: True if operation is successful, False otherwise.
         """
         try:
-            with self._lock:
-                conn = self._get_connection()
+            with self._write_transaction() as conn:
                 cursor = conn.cursor()
                 
-                # Check if file exists
-                cursor.execute(
-                    "SELECT id FROM files WHERE id = ?",
-                    (file_data['id'],)
-                )
-                exists = cursor.fetchone()
-                
-                current_time = datetime.now().isoformat()
-                
-                if exists:
-                    # Update existing file
-                    cursor.execute('''
-                        UPDATE files
-                        SET name = ?,
-                            parent_id = ?,
-                            mime_type = ?,
-                            modified_time = ?,
-                            size = ?,
-                            md5_checksum = ?,
-                            path = ?,
-                            last_checked = ?,
-                            status = ?
-                        WHERE id = ?
-                    ''', (
-                        file_data['name'],
-                        file_data.get('parent_id'),
-                        file_data.get('mimeType'),
-                        file_data.get('modifiedTime'),
-                        file_data.get('size'),
-                        file_data.get('md5Checksum'),
-                        file_data.get('path'),
-                        current_time,
-                        file_data.get('status', 'synced'),
-                        file_data['id']
-                    ))
-                else:
-                    # Insert new file
-                    cursor.execute('''
-                        INSERT INTO files (
-                            id, name, parent_id, mime_type, modified_time,
-                            size, md5_checksum, path, last_checked, status
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        file_data['id'],
-                        file_data['name'],
-                        file_data.get('parent_id'),
-                        file_data.get('mimeType'),
-                        file_data.get('modifiedTime'),
-                        file_data.get('size'),
-                        file_data.get('md5Checksum'),
-                        file_data.get('path'),
-                        current_time,
-                        file_data.get('status', 'new')
-                    ))
-                
-                conn.commit()
+                cursor.execute(UPSERT_FILE_SQL, self._file_params(file_data))
                 return True
         except sqlite3.Error as e:
             logger.error(f"Error upserting file {file_data.get('id')}: {e}")
             return False
     
+    def upsert_files_bulk(self, file_data_list):
+        """
+        Insert or update metadata for many files in a single transaction.
+        
+        Args:
+            file_data_list (list): List of file metadata dictionaries.
+            
+        Returns:
+            bool: True if operation is successful, False otherwise.
+        """
+        if not file_data_list:
+            return True
+        
+        try:
+            with self._write_transaction() as conn:
+                self._upsert_files(conn.cursor(), file_data_list)
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error upserting {len(file_data_list)} files: {e}")
+            return False
+    
+    @classmethod
+    def _upsert_files(cls, cursor, file_data_list):
+        """
+        Insert or update metadata for many files with one executemany call.
+        
+        Must be called inside a write transaction.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor of the transaction's connection.
+            file_data_list (list): List of file metadata dictionaries.
+        """
+        cursor.executemany(UPSERT_FILE_SQL, [cls._file_params(file_data) for file_data in file_data_list])
+    
+    @staticmethod
+    def _file_params(file_data):
+        """
+        Build the UPSERT parameters for a file.
+        
+        Args:
+            file_data (dict): File metadata.
+            
+        Returns:
+            dict: Named parameters for UPSERT_FILE_SQL.
+        """
+        return {
+            'id': file_data['id'],
+            'name': file_data['name'],
+            'parent_id': file_data.get('parent_id'),
+            'mime_type': file_data.get('mimeType'),
+            'modified_time': file_data.get('modifiedTime'),
+            'size': file_data.get('size'),
+            'md5_checksum': file_data.get('md5Checksum'),
+            'path': file_data.get('path'),
+            'status': file_data.get('status')
+        }
+    
     def add_sync_history(self, file_id, action, details=None):
         """
         Add a record to the sync history.
@@ -211,29 +376,81 @@ class DatabaseManager:
             bool: True if operation is successful, False otherwise.
         """
         try:
-            with self._lock:
-                conn = self._get_connection()
+            with self._write_transaction() as conn:
                 cursor = conn.cursor()
                 
-                current_time = datetime.now().isoformat()
-                
-                cursor.execute('''
-                    INSERT INTO sync_history (
-                        file_id, action, timestamp, details
-                    ) VALUES (?, ?, ?, ?)
-                ''', (
+                cursor.execute(ADD_HISTORY_SQL, (
                     file_id,
                     action,
-                    current_time,
                     details
                 ))
                 
-                conn.commit()
                 return True
         except sqlite3.Error as e:
             logger.error(f"Error adding sync history for file {file_id}: {e}")
             return False
     
+    def add_sync_history_bulk(self, records):
+        """
+        Add many records to the sync history in a single transaction.
+        
+        Args:
+            records (list): List of (file_id, action, details) tuples.
+            
+        Returns:
+            bool: True if operation is successful, False otherwise.
+        """
+        if not records:
+            return True
+        
+        try:
+            with self._write_transaction() as conn:
+                self._add_history(conn.cursor(), records)
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error adding {len(records)} sync history records: {e}")
+            return False
+    
+    @staticmethod
+    def _add_history(cursor, records):
+        """
+        Add many records to the sync history with one executemany call.
+        
+        Must be called inside a write transaction.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor of the transaction's connection.
+            records (list): List of (file_id, action, details) tuples.
+        """
+        cursor.executemany(ADD_HISTORY_SQL, records)
+    
+    def record_changes(self, file_data_list, deleted_ids, history_records, state=None):
+        """
+        Record the outcome of a poll in a single transaction.
+        
+        Args:
+            file_data_list (list): File metadata dictionaries to insert or update.
+            deleted_ids (list): IDs of files to mark as deleted.
+            history_records (list): List of (file_id, action, details) tuples.
+            state (dict, optional): sync_state values to store with the changes.
+            
+        Returns:
+            bool: True if operation is successful, False otherwise.
+        """
+        try:
+            with self._write_transaction() as conn:
+                cursor = conn.cursor()
+                
+                self._upsert_files(cursor, file_data_list)
+                cursor.executemany(UPDATE_FILE_STATUS_SQL, [('deleted', file_id) for file_id in deleted_ids])
+                self._add_history(cursor, history_records)
+                if state:
+                    cursor.executemany(SET_STATE_SQL, state.items())
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error recording changes for {len(file_data_list)} files: {e}")
+            return False
+    
     def get_file(self, file_id):
         """
         Get file metadata by ID.
@@ -245,22 +462,71 @@ class DatabaseManager:
             dict: File metadata or None if not found.
         """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT * FROM files WHERE id = ?",
-                (file_id,)
-            )
-            row = cursor.fetchone()
-            
-            if row:
-                return dict(row)
-            return None
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(GET_FILE_SQL, (file_id,))
+                row = cursor.fetchone()
+                
+                if row:
+                    return dict(row)
+                return None
         except sqlite3.Error as e:
             logger.error(f"Error getting file {file_id}: {e}")
             return None
     
+    def get_files_bulk(self, file_ids):
+        """
+        Get metadata for several files by ID.
+        
+        Args:
+            file_ids (list): The IDs of the files.
+            
+        Returns:
+            dict: Mapping of file ID to file metadata for the files found.
+        """
+        files = {}
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                for start in range(0, len(file_ids), MAX_IN_QUERY_IDS):
+                    chunk = list(file_ids[start:start + MAX_IN_QUERY_IDS])
+                    sql = GET_FILES_BY_IDS_SQL.format(placeholders=', '.join('?' * len(chunk)))
+                    cursor.execute(sql, chunk)
+                    for row in cursor.fetchall():
+                        files[row['id']] = dict(row)
+                
+                return files
+        except sqlite3.Error as e:
+            logger.error(f"Error getting {len(file_ids)} files: {e}")
+            return {}
+    
+    def iter_all_files(self, batch_size=1000):
+        """
+        Iterate over all files in the database without materializing them.
+        
+        Rows are fetched in batches and yielded as sqlite3.Row objects, which
+        support both index and column-name access. A pooled connection is held
+        until the iterator is exhausted or closed.
+        
+        Args:
+            batch_size (int): Number of rows fetched per round-trip.
+            
+        Yields:
+            sqlite3.Row: File metadata row.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = batch_size
+            cursor.execute(GET_ALL_FILES_SQL)
+            
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                yield from rows
+    
     def get_all_files(self):
         """
         Get all files in the database.
@@ -269,13 +535,7 @@ class DatabaseManager:
             list: List of file metadata dictionaries.
         """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM files")
-            rows = cursor.fetchall()
-            
-            return [dict(row) for row in rows]
+            return [dict(row) for row in self.iter_all_files()]
         except sqlite3.Error as e:
             logger.error(f"Error getting all files: {e}")
             return []
@@ -291,16 +551,13 @@ class DatabaseManager:
             list: List of file metadata dictionaries.
         """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT * FROM files WHERE status = ?",
-                (status,)
-            )
-            rows = cursor.fetchall()
-            
-            return [dict(row) for row in rows]
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(GET_FILES_BY_STATUS_SQL, (status,))
+                rows = cursor.fetchall()
+                
+                return [dict(row) for row in rows]
         except sqlite3.Error as e:
             logger.error(f"Error getting files by status {status}: {e}")
             return []
@@ -317,20 +574,41 @@ class DatabaseManager:
             bool: True if operation is successful, False otherwise.
         """
         try:
-            with self._lock:
-                conn = self._get_connection()
+            with self._write_transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute(
-                    "UPDATE files SET status = ? WHERE id = ?",
-                    (status, file_id)
-                )
-                conn.commit()
+                cursor.execute(UPDATE_FILE_STATUS_SQL, (status, file_id))
                 return True
         except sqlite3.Error as e:
             logger.error(f"Error updating status for file {file_id}: {e}")
             return False
     
+    def update_file_status_bulk(self, file_ids, status):
+        """
+        Update the status of many files in a single transaction.
+        
+        Args:
+            file_ids (list): The IDs of the files.
+            status (str): The new status.
+            
+        Returns:
+            bool: True if operation is successful, False otherwise.
+        """
+        if not file_ids:
+            return True
+        
+        try:
+            with self._write_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    UPDATE_FILE_STATUS_SQL,
+                    [(status, file_id) for file_id in file_ids]
+                )
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error updating status for {len(file_ids)} files: {e}")
+            return False
+    
     def delete_file(self, file_id):
         """
         Delete a file from the database.
@@ -342,16 +620,56 @@ class DatabaseManager:
             bool: True if operation is successful, False otherwise.
         """
         try:
-            with self._lock:
-                conn = self._get_connection()
+            with self._write_transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute(
-                    "DELETE FROM files WHERE id = ?",
-                    (file_id,)
-                )
-                conn.commit()
+                cursor.execute(DELETE_FILE_SQL, (file_id,))
                 return True
         except sqlite3.Error as e:
             logger.error(f"Error deleting file {file_id}: {e}")
             return False
+    
+    def get_state(self, key):
+        """
+        Get a stored sync state value.
+        
+        Args:
+            key (str): The state key.
+            
+        Returns:
+            str: The stored value or None if not set.
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(GET_STATE_SQL, (key,))
+                row = cursor.fetchone()
+                
+                if row:
+                    return row['value']
+                return None
+        except sqlite3.Error as e:
+            logger.error(f"Error getting sync state {key}: {e}")
+            return None
+    
+    def set_state(self, key, value):
+        """
+        Store a sync state value.
+        
+        Args:
+            key (str): The state key.
+            value (str): The value to store.
+            
+        Returns:
+            bool: True if operation is successful, False otherwise.
+        """
+        try:
+            with self._write_transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(SET_STATE_SQL, (key, value))
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error setting sync state {key}: {e}")
+            return False
@@ -6,16 +6,40 @@ This module provides functionality to interact with the Dify API.
 
 import os
 import json
+import uuid
 import logging
+import mimetypes
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union, Tuple
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterable, Iterator
 
 logger = logging.getLogger(__name__)
 
 # Type definitions
 PathLike = Union[str, Path]
 
+# Load the system MIME database once at import time
+mimetypes.init()
+
+
+@lru_cache(maxsize=256)
+def _mime_type_for_suffix(suffix: str) -> str:
+    """
+    Get the MIME type for a file extension.
+    
+    Args:
+        suffix: Lower-cased file extension, including the leading dot.
+        
+    Returns:
+        MIME type for the extension.
+    """
+    mime_type, _ = mimetypes.guess_type('file' + suffix)
+    return mime_type or 'application/octet-stream'
+
 
 class DifyClient:
     """Client for interacting with the Dify API."""
@@ -47,15 +71,35 @@ class DifyClient:
         # Replace dataset_id placeholder in URL if needed
         self.api_url = self.api_url.replace('{dataset_id}', self.dataset_id)
         
+        # Base URLs for single-document and document-list endpoints
+        self._doc_url_base = self.api_url.replace('document/create-by-file', 'document')
+        self._docs_url_base = self.api_url.replace('document/create-by-file', 'documents')
+        
+        # Reuse pooled keep-alive connections across API calls, backing off
+        # on rate limiting and transient server errors
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+        
         logger.info(f"Dify API client initialized for dataset {self.dataset_id}")
     
-    def upload_file(self, file_path: PathLike, metadata: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
+    def upload_file(self, file_path: PathLike, metadata: Optional[Dict[str, Any]] = None,
+                    file_name: Optional[str] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         Upload a file to the Dify API.
         
         Args:
             file_path: Path to the file to upload.
             metadata: Optional metadata to include with the file.
+            file_name: Optional name to upload the file as. Defaults to the name on disk.
             
         Returns:
             Tuple of (success, response_data).
@@ -70,56 +114,118 @@ class DifyClient:
             logger.error(f"File not found: {file_path}")
             return False, {"error": "File not found"}
         
+        if file_name is None:
+            file_name = file_path.name
+        
         try:
-            # Prepare headers
-            headers = {
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
             # Prepare metadata
             if metadata is None:
                 metadata = {}
             
             # Add file name to metadata if not present
             if 'name' not in metadata:
-                metadata['name'] = file_path.name
+                metadata['name'] = file_name
             
-            # Prepare the file for upload
+            # Prepare the file for upload; the multipart body is streamed
+            # from disk rather than built in memory
             with open(file_path, 'rb') as file:
-                files = {
-                    'file': (file_path.name, file, self._get_mime_type(file_path))
-                }
-                
-                # Prepare form data
-                data = {
-                    'metadata': json.dumps(metadata)
-                }
+                encoder = MultipartEncoder(fields={
+                    'metadata': json.dumps(metadata),
+                    'file': (file_name, file, self._get_mime_type(file_path))
+                })
                 
-                logger.info(f"Uploading file {file_path.name} to Dify API")
+                logger.info(f"Uploading file {file_name} to Dify API")
                 
                 # Make the request
-                response = requests.post(
+                response = self._session.post(
                     self.api_url,
-                    headers=headers,
-                    data=data,
-                    files=files
+                    data=encoder,
+                    headers={"Content-Type": encoder.content_type}
                 )
                 
                 # Check response
                 if response.status_code == 200 or response.status_code == 201:
                     response_data = response.json()
-                    logger.info(f"File {file_path.name} uploaded successfully. Document ID: {response_data.get('id', 'unknown')}")
+                    logger.info(f"File {file_name} uploaded successfully. Document ID: {response_data.get('id', 'unknown')}")
                     return True, response_data
                 else:
-                    logger.error(f"Failed to upload file {file_path.name}. Status code: {response.status_code}")
+                    logger.error(f"Failed to upload file {file_name}. Status code: {response.status_code}")
                     logger.error(f"Response: {response.text}")
                     return False, {"error": f"API error: {response.status_code}", "details": response.text}
                 
         except requests.RequestException as e:
-            logger.exception(f"Request error uploading file {file_path.name}: {e}")
+            logger.exception(f"Request error uploading file {file_name}: {e}")
             return False, {"error": f"Request error: {str(e)}"}
         except Exception as e:
-            logger.exception(f"Error uploading file {file_path.name}: {e}")
+            logger.exception(f"Error uploading file {file_name}: {e}")
+            return False, {"error": str(e)}
+    
+    def upload_stream(self, file_name: str, chunks: Iterable[bytes],
+                      metadata: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Upload file content to the Dify API as it is produced.
+        
+        The multipart body is sent with chunked transfer encoding while the
+        chunks are read, so the file is never held in full on disk or in memory.
+        
+        Args:
+            file_name: Name to upload the file as.
+            chunks: Iterable over the file content.
+            metadata: Optional metadata to include with the file.
+            
+        Returns:
+            Tuple of (success, response_data).
+        """
+        # Prepare metadata
+        if metadata is None:
+            metadata = {}
+        
+        # Add file name to metadata if not present
+        if 'name' not in metadata:
+            metadata['name'] = file_name
+        
+        boundary = uuid.uuid4().hex
+        mime_type = self._get_mime_type(Path(file_name))
+        quoted_name = file_name.replace('\\', '\\\\').replace('"', '\\"')
+        
+        def body() -> Iterator[bytes]:
+            yield (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="metadata"\r\n\r\n'
+                f'{json.dumps(metadata)}\r\n'
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="file"; filename="{quoted_name}"\r\n'
+                f'Content-Type: {mime_type}\r\n\r\n'
+            ).encode('utf-8')
+            for chunk in chunks:
+                if chunk:
+                    yield chunk
+            yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        
+        try:
+            logger.info(f"Streaming file {file_name} to Dify API")
+            
+            response = self._session.post(
+                self.api_url,
+                data=body(),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+            )
+            
+            # Check response
+            if response.status_code == 200 or response.status_code == 201:
+                response_data = response.json()
+                logger.info(f"File {file_name} uploaded successfully. Document ID: {response_data.get('id', 'unknown')}")
+                return True, response_data
+            else:
+                logger.error(f"Failed to upload file {file_name}. Status code: {response.status_code}")
+                logger.error(f"Response: {response.text}")
+                return False, {"error": f"API error: {response.status_code}", "details": response.text}
+                
+        except requests.RequestException as e:
+            logger.exception(f"Request error uploading file {file_name}: {e}")
+            return False, {"error": f"Request error: {str(e)}"}
+        except Exception as e:
+            logger.exception(f"Error uploading file {file_name}: {e}")
             return False, {"error": str(e)}
     
     def delete_document(self, document_id: str) -> Tuple[bool, Dict[str, Any]]:
@@ -135,17 +241,16 @@ class DifyClient:
         try:
             # Prepare headers
             headers = {
-                "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
             }
             
             # Construct delete URL
-            delete_url = f"{self.api_url.replace('document/create-by-file', 'document')}/{document_id}"
+            delete_url = f"{self._doc_url_base}/{document_id}"
             
             logger.info(f"Deleting document {document_id} from Dify API")
             
             # Make the request
-            response = requests.delete(
+            response = self._session.delete(
                 delete_url,
                 headers=headers
             )
@@ -179,17 +284,16 @@ class DifyClient:
         try:
             # Prepare headers
             headers = {
-                "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
             }
             
             # Construct status URL
-            status_url = f"{self.api_url.replace('document/create-by-file', 'document')}/{document_id}"
+            status_url = f"{self._doc_url_base}/{document_id}"
             
             logger.debug(f"Checking status of document {document_id}")
             
             # Make the request
-            response = requests.get(
+            response = self._session.get(
                 status_url,
                 headers=headers
             )
@@ -225,17 +329,16 @@ class DifyClient:
         try:
             # Prepare headers
             headers = {
-                "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
             }
             
             # Construct list URL
-            list_url = f"{self.api_url.replace('document/create-by-file', 'documents')}?limit={limit}&offset={offset}"
+            list_url = f"{self._docs_url_base}?limit={limit}&offset={offset}"
             
             logger.info(f"Listing documents from Dify API (limit={limit}, offset={offset})")
             
             # Make the request
-            response = requests.get(
+            response = self._session.get(
                 list_url,
                 headers=headers
             )
@@ -257,6 +360,10 @@ class DifyClient:
             logger.exception(f"Error listing documents: {e}")
             return False, {"error": str(e)}
     
+    def close(self) -> None:
+        """Close the underlying HTTP session and its pooled connections."""
+        self._session.close()
+    
     def _get_mime_type(self, file_path: Path) -> str:
         """
         Get the MIME type of a file.
@@ -267,6 +374,4 @@ class DifyClient:
         Returns:
             MIME type of the file.
         """
-        import mimetypes
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type or 'application/octet-stream'
+        return _mime_type_for_suffix(file_path.suffix.lower())
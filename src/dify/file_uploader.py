@@ -7,8 +7,12 @@ This module provides functionality to upload files to the Dify API.
 import os
 import logging
 import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union, Tuple
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterable
 
 from src.dify.dify_client import DifyClient
 from src.database.db_manager import DatabaseManager
@@ -19,6 +23,11 @@ logger = logging.getLogger(__name__)
 PathLike = Union[str, Path]
 FileDict = Dict[str, Any]
 
+# Status writes are flushed to the database in batches of up to this many
+# events, at most this many seconds after the first one is queued
+STATUS_FLUSH_BATCH = 100
+STATUS_FLUSH_INTERVAL = 0.5
+
 
 class FileUploader:
     """Uploads files to the Dify API and tracks upload status."""
@@ -29,19 +38,35 @@ class FileUploader:
     STATUS_UPLOADED = 'uploaded'
     STATUS_FAILED = 'failed'
     
-    def __init__(self, dify_client: DifyClient, db_manager: DatabaseManager):
+    def __init__(self, dify_client: DifyClient, db_manager: DatabaseManager, max_workers: int = 8,
+                 max_status_entries: int = 10000):
         """
         Initialize the file uploader.
         
         Args:
             dify_client: The Dify API client.
             db_manager: The database manager for tracking file status.
+            max_workers: Maximum number of concurrent uploads in upload_files.
+            max_status_entries: Maximum number of upload statuses kept in memory;
+                                the least recently updated are evicted first.
         """
         self.dify_client = dify_client
         self.db_manager = db_manager
+        self.max_workers = max_workers
+        self.max_status_entries = max_status_entries
+        
+        # Track upload status (updated from worker threads)
+        self.upload_status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._status_lock = threading.Lock()
         
-        # Track upload status
-        self.upload_status: Dict[str, Dict[str, Any]] = {}
+        # Database status writes are queued and persisted by a background thread
+        self._status_queue: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._status_flusher = threading.Thread(
+            target=self._flush_status_loop,
+            name="upload-status-flusher",
+            daemon=True
+        )
+        self._status_flusher.start()
     
     def upload_file(self, file_data: FileDict, file_path: PathLike) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -59,9 +84,8 @@ class FileUploader:
             return False, {"error": "Invalid file data: missing ID"}
             
         file_id = file_data['id']
-        file_path = Path(file_path)
         
-        if not file_path.exists():
+        if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
             self._update_status(file_id, self.STATUS_FAILED, {"error": "File not found"})
             return False, {"error": "File not found"}
@@ -70,28 +94,23 @@ class FileUploader:
             # Update status to uploading
             self._update_status(file_id, self.STATUS_UPLOADING)
             
+            # Upload under the original name, without the file ID prefix
+            # DownloadManager adds to downloaded files
+            file_name = os.path.basename(file_path)
+            prefix = f"{file_id}__"
+            if file_name.startswith(prefix):
+                file_name = file_name[len(prefix):]
+            
             # Prepare metadata
-            metadata = {
-                'name': file_data.get('name', file_path.name),
-                'google_drive_id': file_id,
-                'mime_type': file_data.get('mimeType', ''),
-                'modified_time': file_data.get('modifiedTime', ''),
-                'size': file_data.get('size', 0),
-                'path': file_data.get('path', '')
-            }
+            metadata = self._build_metadata(file_data, file_name)
             
             # Upload the file
-            success, response = self.dify_client.upload_file(file_path, metadata)
+            success, response = self.dify_client.upload_file(file_path, metadata, file_name)
             
             if success:
-                # Update database with document ID
-                document_id = response.get('id')
-                if document_id:
-                    self.db_manager.update_file_status(
-                        file_id, 
-                        self.STATUS_UPLOADED, 
-                        {'dify_document_id': document_id}
-                    )
+                # Queue the database status update
+                if response.get('id'):
+                    self._status_queue.put((file_id, self.STATUS_UPLOADED))
                 
                 # Update status to uploaded
                 self._update_status(file_id, self.STATUS_UPLOADED, response)
@@ -106,9 +125,76 @@ class FileUploader:
             self._update_status(file_id, self.STATUS_FAILED, {"error": str(e)})
             return False, {"error": str(e)}
     
+    def upload_stream(self, file_data: FileDict, chunks: Iterable[bytes]) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Upload a file to the Dify API while it is being downloaded.
+        
+        Args:
+            file_data: File metadata dictionary.
+            chunks: Iterable over the file content.
+            
+        Returns:
+            Tuple of (success, response_data).
+        """
+        if not file_data or 'id' not in file_data:
+            logger.error("Invalid file data: missing ID")
+            return False, {"error": "Invalid file data: missing ID"}
+            
+        file_id = file_data['id']
+        
+        try:
+            # Update status to uploading
+            self._update_status(file_id, self.STATUS_UPLOADING)
+            
+            file_name = file_data.get('name') or file_id
+            metadata = self._build_metadata(file_data, file_name)
+            
+            # Upload the file
+            success, response = self.dify_client.upload_stream(file_name, chunks, metadata)
+            
+            if success:
+                # Queue the database status update
+                if response.get('id'):
+                    self._status_queue.put((file_id, self.STATUS_UPLOADED))
+                
+                # Update status to uploaded
+                self._update_status(file_id, self.STATUS_UPLOADED, response)
+                return True, response
+            else:
+                # Update status to failed
+                self._update_status(file_id, self.STATUS_FAILED, response)
+                return False, response
+                
+        except Exception as e:
+            logger.exception(f"Error uploading file {file_data.get('name', 'unknown')}: {e}")
+            self._update_status(file_id, self.STATUS_FAILED, {"error": str(e)})
+            return False, {"error": str(e)}
+    
+    @staticmethod
+    def _build_metadata(file_data: FileDict, file_name: str) -> Dict[str, Any]:
+        """
+        Build the Dify document metadata for a file.
+        
+        Args:
+            file_data: File metadata dictionary.
+            file_name: Name to fall back to when the file data has none.
+            
+        Returns:
+            Metadata dictionary.
+        """
+        get = file_data.get
+        return {
+            'name': get('name') or file_name,
+            'google_drive_id': file_data['id'],
+            'mime_type': get('mimeType', ''),
+            'modified_time': get('modifiedTime', ''),
+            'size': get('size', 0),
+            'path': get('path', '')
+        }
+    
     def upload_files(self, files: List[Tuple[FileDict, PathLike]]) -> Dict[str, Dict[str, Any]]:
         """
-        Upload multiple files to the Dify API.
+        Upload multiple files to the Dify API concurrently.
         
         Args:
             files: List of (file_data, file_path) tuples.
@@ -118,13 +204,22 @@ class FileUploader:
         """
         results = {}
         
-        for file_data, file_path in files:
-            file_id = file_data['id']
-            success, response = self.upload_file(file_data, file_path)
-            results[file_id] = {
-                'success': success,
-                'response': response
+        if not files:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(files))) as executor:
+            futures = {
+                executor.submit(self.upload_file, file_data, file_path): file_data['id']
+                for file_data, file_path in files
             }
+            
+            for future in as_completed(futures):
+                file_id = futures[future]
+                success, response = future.result()
+                results[file_id] = {
+                    'success': success,
+                    'response': response
+                }
         
         return results
     
@@ -138,33 +233,75 @@ class FileUploader:
         Returns:
             Tuple of (success, response_data).
         """
+        result = self.delete_documents([file_id])[file_id]
+        return result['success'], result['response']
+    
+    def delete_documents(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Delete several documents from the Dify API.
+        
+        Database rows are fetched in one query, the Dify deletions run
+        concurrently, and the statuses of the deleted files are updated in
+        one transaction.
+        
+        Args:
+            file_ids: The Google Drive file IDs.
+            
+        Returns:
+            Dictionary mapping file IDs to deletion results.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        if not file_ids:
+            return results
+        
         try:
-            # Get the Dify document ID from the database
-            file_info = self.db_manager.get_file(file_id)
+            # Get the Dify document IDs from the database
+            file_infos = self.db_manager.get_files_bulk(file_ids)
+        except Exception as e:
+            logger.exception(f"Error loading files for document deletion: {e}")
+            return {file_id: {'success': False, 'response': {"error": str(e)}} for file_id in file_ids}
+        
+        documents = {}
+        for file_id in file_ids:
+            file_info = file_infos.get(file_id)
             
             if not file_info:
                 logger.error(f"File not found in database: {file_id}")
-                return False, {"error": "File not found in database"}
+                results[file_id] = {'success': False, 'response': {"error": "File not found in database"}}
+                continue
             
             document_id = file_info.get('dify_document_id')
             
             if not document_id:
                 logger.error(f"No Dify document ID found for file: {file_id}")
-                return False, {"error": "No Dify document ID found"}
-            
-            # Delete the document
-            success, response = self.dify_client.delete_document(document_id)
+                results[file_id] = {'success': False, 'response': {"error": "No Dify document ID found"}}
+                continue
             
-            if success:
-                # Update database
-                self.db_manager.update_file_status(file_id, 'deleted')
-                return True, response
-            else:
-                return False, response
+            documents[file_id] = document_id
+        
+        if documents:
+            # Delete the documents
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(documents))) as executor:
+                futures = {
+                    executor.submit(self.dify_client.delete_document, document_id): file_id
+                    for file_id, document_id in documents.items()
+                }
                 
-        except Exception as e:
-            logger.exception(f"Error deleting document for file {file_id}: {e}")
-            return False, {"error": str(e)}
+                for future in as_completed(futures):
+                    file_id = futures[future]
+                    try:
+                        success, response = future.result()
+                    except Exception as e:
+                        logger.exception(f"Error deleting document for file {file_id}: {e}")
+                        success, response = False, {"error": str(e)}
+                    results[file_id] = {'success': success, 'response': response}
+            
+            # Update database
+            deleted_ids = [file_id for file_id in documents if results[file_id]['success']]
+            self.db_manager.update_file_status_bulk(deleted_ids, 'deleted')
+        
+        return results
     
     def get_upload_status(self, file_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -176,22 +313,76 @@ class FileUploader:
         Returns:
             Upload status dictionary or None if not found.
         """
-        return self.upload_status.get(file_id)
+        with self._status_lock:
+            return self.upload_status.get(file_id)
+    
+    def flush(self) -> None:
+        """Block until all queued database status updates have been written."""
+        self._status_queue.join()
+    
+    def _flush_status_loop(self) -> None:
+        """Collect queued status updates and write them to the database in batches."""
+        while True:
+            events = [self._status_queue.get()]
+            deadline = time.monotonic() + STATUS_FLUSH_INTERVAL
+            
+            while len(events) < STATUS_FLUSH_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    events.append(self._status_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_statuses(events)
+            finally:
+                for _ in events:
+                    self._status_queue.task_done()
+    
+    def _write_statuses(self, events: List[Tuple[str, str]]) -> None:
+        """
+        Write status updates to the database, one bulk update per status.
+        
+        Args:
+            events: List of (file_id, status) tuples, oldest first.
+        """
+        # Only the latest status of each file matters
+        latest = dict(events)
+        
+        by_status: Dict[str, List[str]] = {}
+        for file_id, status in latest.items():
+            by_status.setdefault(status, []).append(file_id)
+        
+        for status, file_ids in by_status.items():
+            try:
+                self.db_manager.update_file_status_bulk(file_ids, status)
+            except Exception as e:
+                logger.error(f"Error writing status '{status}' for {len(file_ids)} files: {e}")
     
     def _update_status(self, file_id: str, status: str, data: Optional[Dict[str, Any]] = None) -> None:
         """
         Update the upload status of a file.
         
+        Only failures keep their response data, and the oldest entries are
+        evicted once max_status_entries is exceeded.
+        
         Args:
             file_id: The Google Drive file ID.
             status: The new status.
             data: Optional additional data.
         """
-        if data is None:
+        if data is None or status != self.STATUS_FAILED:
             data = {}
         
-        self.upload_status[file_id] = {
-            'status': status,
-            'timestamp': time.time(),
-            'data': data
-        }
+        with self._status_lock:
+            self.upload_status[file_id] = {
+                'status': status,
+                'timestamp': time.time(),
+                'data': data
+            }
+            self.upload_status.move_to_end(file_id)
+            
+            while len(self.upload_status) > self.max_status_entries:
+                self.upload_status.popitem(last=False)
@@ -5,12 +5,77 @@ This module detects new and modified files in Google Drive.
 """
 
 import os
+import re
+import json
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+
+from src.drive.service_drive_client import FOLDER_MIME_TYPE
 
 logger = logging.getLogger(__name__)
 
+# Drive's RFC 3339 timestamps, e.g. 2024-01-31T12:34:56.789Z
+_TIMESTAMP_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?Z?$')
+
+# Fallback formats for timestamps the fast path does not match
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%fZ",  # ISO format with microseconds
+    "%Y-%m-%dT%H:%M:%SZ",     # ISO format without microseconds
+    "%Y-%m-%dT%H:%M:%S.%f",   # ISO format with microseconds, no Z
+    "%Y-%m-%dT%H:%M:%S"       # ISO format without microseconds, no Z
+)
+
+# Drive metadata cache limits for parent folder lookups
+METADATA_CACHE_TTL = 60
+METADATA_CACHE_SIZE = 4096
+
+# Worker threads resolving uncached parent folder paths
+PATH_RESOLVE_WORKERS = 8
+
+# sync_state keys for the Drive changes feed position and the folder tree
+# it is filtered against
+CHANGES_TOKEN_KEY = 'changes_page_token'
+TREE_FOLDERS_KEY = 'tree_folder_ids'
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp_cached(timestamp_str):
+    """
+    Parse a timestamp string to a datetime object.
+    
+    Args:
+        timestamp_str (str): The non-empty timestamp string.
+        
+    Returns:
+        datetime: The parsed datetime or None if parsing fails.
+    """
+    match = _TIMESTAMP_RE.match(timestamp_str)
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day),
+                int(hour), int(minute), int(second),
+                int((fraction + '000000')[:6]) if fraction else 0
+            )
+        except ValueError:
+            pass
+    
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(timestamp_str, fmt)
+        except ValueError:
+            continue
+    
+    # If none of the formats match
+    logger.warning(f"Could not parse timestamp: {timestamp_str}")
+    return None
+
 
 class ChangeDetector:
     """Detects changes in Google Drive files."""
@@ -26,6 +91,14 @@ class ChangeDetector:
         self.drive_client = drive_client
         self.db_manager = db_manager
         
+        # Resolved folder paths keyed by folder ID, valid for one detect_changes run
+        self._path_cache = {}
+        
+        # Drive metadata keyed by file ID, as (expiry time, metadata) pairs;
+        # the lock guards it while parent paths are resolved in parallel
+        self._meta_cache = {}
+        self._meta_lock = threading.Lock()
+        
     def build_file_path(self, file_id, parent_id=None, file_name=None):
         """
         Build the file path for a file.
@@ -42,29 +115,83 @@ class ChangeDetector:
             # Root folder
             return file_name if file_name else ""
         
+        parent_path = self._path_cache.get(parent_id)
+        if parent_path is None:
+            parent_path = self._resolve_parent_path(parent_id)
+            if parent_path is None:
+                # Fallback
+                return file_name if file_name else ""
+            self._path_cache[parent_id] = parent_path
+        
+        return os.path.join(parent_path, file_name if file_name else "")
+    
+    def _resolve_parent_path(self, parent_id):
+        """
+        Resolve the path of a parent folder that is not yet cached.
+        
+        Args:
+            parent_id (str): The ID of the parent folder.
+            
+        Returns:
+            str: The folder path, or None if it cannot be resolved.
+        """
         # Get parent file
         parent_file = self.db_manager.get_file(parent_id)
         if parent_file and parent_file.get('path'):
             # Parent path exists in database
-            return os.path.join(parent_file['path'], file_name if file_name else "")
+            return parent_file['path']
         
         # Try to get parent metadata from Google Drive
-        parent_metadata = self.drive_client.get_file_metadata(parent_id)
+        parent_metadata = self._get_file_metadata(parent_id)
         if parent_metadata:
-            parent_path = self.build_file_path(
+            return self.build_file_path(
                 parent_metadata['id'],
                 parent_metadata.get('parents', [None])[0] if 'parents' in parent_metadata else None,
                 parent_metadata['name']
             )
-            return os.path.join(parent_path, file_name if file_name else "")
         
-        # Fallback
-        return file_name if file_name else ""
+        return None
+    
+    def _get_file_metadata(self, file_id):
+        """
+        Get Drive metadata for a file, reusing lookups made in the last METADATA_CACHE_TTL seconds.
+        
+        Args:
+            file_id (str): The ID of the file.
+            
+        Returns:
+            dict: The file metadata or None if not found.
+        """
+        now = time.monotonic()
+        with self._meta_lock:
+            cached = self._meta_cache.get(file_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        metadata = self.drive_client.get_file_metadata(file_id)
+        if metadata is None:
+            return None
+        
+        with self._meta_lock:
+            if len(self._meta_cache) >= METADATA_CACHE_SIZE:
+                # Drop expired entries, then the oldest ones if still full
+                self._meta_cache = {
+                    key: value for key, value in self._meta_cache.items() if value[0] > now
+                }
+                while len(self._meta_cache) >= METADATA_CACHE_SIZE:
+                    del self._meta_cache[next(iter(self._meta_cache))]
+            
+            self._meta_cache[file_id] = (now + METADATA_CACHE_TTL, metadata)
+        return metadata
     
     def detect_changes(self, folder_id=None):
         """
         Detect changes in files.
         
+        The configured folder is checked through the Drive changes feed when a
+        feed position is stored, so only files changed since the last poll are
+        fetched. Otherwise the whole folder tree is listed.
+        
         Args:
             folder_id (str, optional): The ID of the folder to check.
                                       If None, uses the configured folder_id.
@@ -74,6 +201,28 @@ class ChangeDetector:
         """
         folder_id = folder_id or self.drive_client.folder_id
         
+        if folder_id == self.drive_client.folder_id:
+            changes = self._detect_changes_incremental()
+            if changes is not None:
+                return changes
+        
+        return self._detect_changes_full(folder_id)
+    
+    def _detect_changes_full(self, folder_id):
+        """
+        Detect changes by listing the whole folder tree.
+        
+        Args:
+            folder_id (str): The ID of the folder to check.
+            
+        Returns:
+            tuple: (new_files, modified_files, deleted_files)
+        """
+        # Take the feed position before listing so changes made during the
+        # listing are reported by the next poll
+        track_changes = folder_id == self.drive_client.folder_id
+        start_page_token = self.drive_client.get_start_page_token() if track_changes else None
+        
         # Get all files from Google Drive
         drive_files = self.drive_client.list_all_files(folder_id)
         
@@ -84,15 +233,121 @@ class ChangeDetector:
         drive_files_dict = {file['id']: file for file in drive_files}
         db_files_dict = {file['id']: file for file in db_files}
         
-        # Find new and modified files
+        state = None
+        if start_page_token and self.drive_client.tree_folder_ids:
+            state = {
+                TREE_FOLDERS_KEY: json.dumps(sorted(self.drive_client.tree_folder_ids)),
+                CHANGES_TOKEN_KEY: start_page_token
+            }
+        
+        return self._apply_changes(
+            drive_files_dict, db_files_dict, db_files_dict.keys() - drive_files_dict.keys(), state
+        )
+    
+    def _detect_changes_incremental(self):
+        """
+        Detect changes in the configured folder tree from the Drive changes feed.
+        
+        Returns:
+            tuple: (new_files, modified_files, deleted_files), or None if the
+                   whole tree has to be listed instead.
+        """
+        page_token = self.db_manager.get_state(CHANGES_TOKEN_KEY)
+        tree_folders = self.db_manager.get_state(TREE_FOLDERS_KEY)
+        if not page_token or not tree_folders:
+            return None
+        
+        tree_folder_ids = set(json.loads(tree_folders))
+        
+        changes, new_page_token = self.drive_client.list_changes(page_token)
+        if changes is None:
+            return None
+        
+        # Replay the changes in order; the last change to a file wins
+        drive_files_dict = {}
+        removed_ids = set()
+        for change in changes:
+            file_id = change['fileId']
+            file_data = change.get('file')
+            
+            if file_id in tree_folder_ids or (
+                file_data and file_data.get('mimeType') == FOLDER_MIME_TYPE
+                and tree_folder_ids.intersection(file_data.get('parents', []))
+            ):
+                # A folder in the tree was added, moved, renamed or removed,
+                # which changes the set of tracked files or their paths
+                logger.info("Folder change detected, listing the whole folder tree")
+                return None
+            
+            if file_data and file_data.get('mimeType') == FOLDER_MIME_TYPE:
+                continue
+            
+            if (change.get('removed') or not file_data or file_data.get('trashed')
+                    or not tree_folder_ids.intersection(file_data.get('parents', []))):
+                # Deleted, trashed or moved out of the tree
+                drive_files_dict.pop(file_id, None)
+                removed_ids.add(file_id)
+            else:
+                drive_files_dict[file_id] = file_data
+                removed_ids.discard(file_id)
+        
+        db_files_dict = self.db_manager.get_files_bulk(list(drive_files_dict.keys() | removed_ids))
+        deleted_ids = {
+            file_id for file_id in removed_ids
+            if file_id in db_files_dict and db_files_dict[file_id].get('status') != 'deleted'
+        }
+        
+        return self._apply_changes(
+            drive_files_dict, db_files_dict, deleted_ids, {CHANGES_TOKEN_KEY: new_page_token}
+        )
+    
+    def _apply_changes(self, drive_files_dict, db_files_dict, deleted_ids, state=None):
+        """
+        Classify Drive files against their database rows and record the result.
+        
+        Args:
+            drive_files_dict (dict): Current Drive metadata keyed by file ID.
+            db_files_dict (dict): Stored metadata keyed by file ID, covering at
+                                  least the Drive files and the deleted files.
+            deleted_ids (set): IDs of stored files no longer in the folder tree.
+            state (dict, optional): sync_state values recorded together with the
+                                    changes, so the feed position only advances
+                                    once the changes are stored.
+            
+        Returns:
+            tuple: (new_files, modified_files, deleted_files)
+        """
+        # Seed the path cache with stored paths so parent lookups that hit
+        # known rows skip the per-file database query
+        self._path_cache = {
+            file_id: file['path'] for file_id, file in db_files_dict.items() if file.get('path')
+        }
+        
+        # Add parent_id to file_data
+        for file_data in drive_files_dict.values():
+            if 'parents' in file_data:
+                file_data['parent_id'] = file_data['parents'][0]
+        
+        # Resolve uncached parent folders concurrently so their database and
+        # Drive lookups overlap; the paths below are then cache hits
+        unresolved = {
+            file_data['parent_id'] for file_data in drive_files_dict.values()
+            if file_data.get('parent_id') not in (None, self.drive_client.folder_id)
+        } - self._path_cache.keys()
+        if unresolved:
+            with ThreadPoolExecutor(max_workers=min(PATH_RESOLVE_WORKERS, len(unresolved))) as executor:
+                for parent_id, parent_path in zip(unresolved, executor.map(self._resolve_parent_path, unresolved)):
+                    if parent_path is not None:
+                        self._path_cache[parent_id] = parent_path
+        
+        # Find new and modified files, collecting database writes so they
+        # can be applied in a few batched transactions
         new_files = []
         modified_files = []
+        upsert_batch = []
+        history_batch = []
         
         for file_id, file_data in drive_files_dict.items():
-            # Add parent_id to file_data
-            if 'parents' in file_data:
-                file_data['parent_id'] = file_data['parents'][0]
-            
             # Build file path
             file_data['path'] = self.build_file_path(
                 file_id,
@@ -100,43 +355,59 @@ class ChangeDetector:
                 file_data['name']
             )
             
-            if file_id not in db_files_dict:
+            db_file = db_files_dict.get(file_id)
+            if db_file is None:
                 # New file
                 file_data['status'] = 'new'
                 new_files.append(file_data)
-                self.db_manager.upsert_file(file_data)
-                self.db_manager.add_sync_history(file_id, 'new')
+                history_batch.append((file_id, 'new', None))
             else:
                 # Existing file, check if modified
-                db_file = db_files_dict[file_id]
+                drive_mt = file_data.get('modifiedTime')
+                db_mt = db_file.get('modified_time')
                 
-                # Convert string timestamps to datetime objects for comparison
-                drive_modified = self._parse_timestamp(file_data.get('modifiedTime'))
-                db_modified = self._parse_timestamp(db_file.get('modified_time'))
+                if (drive_mt and db_mt and len(drive_mt) == len(db_mt)
+                        and drive_mt.endswith('Z') and db_mt.endswith('Z')):
+                    # Same-shaped UTC timestamps order the same as strings
+                    is_modified = drive_mt > db_mt
+                else:
+                    # Convert string timestamps to datetime objects for comparison
+                    drive_modified = self._parse_timestamp(drive_mt)
+                    db_modified = self._parse_timestamp(db_mt)
+                    is_modified = bool(drive_modified and db_modified and drive_modified > db_modified)
                 
-                if drive_modified and db_modified and drive_modified > db_modified:
+                if is_modified:
                     # File was modified
                     file_data['status'] = 'modified'
                     modified_files.append(file_data)
-                    self.db_manager.upsert_file(file_data)
-                    self.db_manager.add_sync_history(
+                    history_batch.append((
                         file_id, 'modified',
                         f"Modified time: {file_data.get('modifiedTime')}"
-                    )
+                    ))
                 else:
                     # File unchanged
                     file_data['status'] = 'synced'
-                    self.db_manager.upsert_file(file_data)
+            
+            upsert_batch.append(file_data)
         
         # Find deleted files
         deleted_files = []
-        for file_id, file_data in db_files_dict.items():
-            if file_id not in drive_files_dict:
-                # File was deleted from Google Drive
-                file_data['status'] = 'deleted'
-                deleted_files.append(file_data)
-                self.db_manager.update_file_status(file_id, 'deleted')
-                self.db_manager.add_sync_history(file_id, 'deleted')
+        for file_id in deleted_ids:
+            # File was deleted from Google Drive
+            file_data = db_files_dict[file_id]
+            file_data['status'] = 'deleted'
+            deleted_files.append(file_data)
+            history_batch.append((file_id, 'deleted', None))
+        
+        self.db_manager.record_changes(
+            upsert_batch,
+            [file_data['id'] for file_data in deleted_files],
+            history_batch,
+            state
+        )
+        
+        # Folder paths may change between polls
+        self._path_cache = {}
         
         logger.info(f"Detected {len(new_files)} new files, {len(modified_files)} modified files, "
                    f"and {len(deleted_files)} deleted files")
@@ -157,23 +428,7 @@ class ChangeDetector:
             return None
         
         try:
-            # Handle different timestamp formats
-            formats = [
-                "%Y-%m-%dT%H:%M:%S.%fZ",  # ISO format with microseconds
-                "%Y-%m-%dT%H:%M:%SZ",     # ISO format without microseconds
-                "%Y-%m-%dT%H:%M:%S.%f",   # ISO format with microseconds, no Z
-                "%Y-%m-%dT%H:%M:%S"       # ISO format without microseconds, no Z
-            ]
-            
-            for fmt in formats:
-                try:
-                    return datetime.strptime(timestamp_str, fmt)
-                except ValueError:
-                    continue
-            
-            # If none of the formats match
-            logger.warning(f"Could not parse timestamp: {timestamp_str}")
-            return None
+            return _parse_timestamp_cached(timestamp_str)
         except Exception as e:
             logger.error(f"Error parsing timestamp {timestamp_str}: {e}")
             return None
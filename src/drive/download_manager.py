@@ -5,11 +5,17 @@ This module provides functionality to download files from Google Drive.
 """
 
 import os
+import sys
+import glob
+import time
+import sqlite3
 import logging
 import tempfile
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple, List, Union
+from typing import Dict, Any, Optional, Tuple, List, Union, Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -17,19 +23,39 @@ logger = logging.getLogger(__name__)
 FileDict = Dict[str, Any]
 PathLike = Union[str, Path]
 
+# Default download chunk size (8 MiB)
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Sidecar database persisting download tracking across runs
+TRACKING_DB_NAME = '.cache.sqlite3'
+
+# Translation table replacing characters that are invalid in filenames
+INVALID_FILENAME_CHARS = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
+# Longest filename most filesystems accept, in encoded bytes
+MAX_FILENAME_BYTES = 255
+
+# Room kept for the extension (e.g. ".xlsx") Google Workspace exports append
+EXPORT_EXTENSION_BYTES = 5
+
 
 class DownloadManager:
     """Manages downloading files from Google Drive."""
     
-    def __init__(self, drive_client, download_dir: Optional[PathLike] = None):
+    def __init__(self, drive_client, download_dir: Optional[PathLike] = None,
+                 max_concurrent_downloads: int = 4, chunk_size: int = DEFAULT_CHUNK_SIZE):
         """
         Initialize the download manager.
         
         Args:
             drive_client: The Google Drive client.
             download_dir: Directory to store downloaded files. If None, uses a temp directory.
+            max_concurrent_downloads: Maximum number of parallel downloads in download_files.
+            chunk_size: Bytes fetched per download request chunk.
         """
         self.drive_client = drive_client
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.chunk_size = chunk_size
         
         if download_dir is None:
             self.download_dir = Path(tempfile.gettempdir()) / "gdrive_sync_downloads"
@@ -38,10 +64,211 @@ class DownloadManager:
         
         # Create download directory if it doesn't exist
         self.download_dir.mkdir(parents=True, exist_ok=True)
+        self._download_dir_str = os.fspath(self.download_dir)
         logger.info(f"Download directory: {self.download_dir}")
         
-        # Track downloaded files
+        # Track downloaded files; the lock guards tracking state shared
+        # with concurrent downloads
         self.downloaded_files: Dict[str, Path] = {}
+        self._lock = threading.Lock()
+        
+        # Version tag (md5Checksum or modifiedTime) of each tracked download
+        self._etags: Dict[str, Optional[str]] = {}
+        
+        # Version tag of the content last uploaded for each file, kept after
+        # the local copy is removed
+        self._uploaded: Dict[str, str] = {}
+        
+        # Restore tracking persisted by previous runs
+        self._tracking_db = self._open_tracking_db()
+        self._load_tracking()
+    
+    def _open_tracking_db(self) -> Optional[sqlite3.Connection]:
+        """
+        Open the sidecar database that persists download tracking.
+        
+        Returns:
+            The database connection, or None if it cannot be opened.
+        """
+        try:
+            conn = sqlite3.connect(self.download_dir / TRACKING_DB_NAME, check_same_thread=False)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS downloads (
+                    file_id TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    etag TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS uploads (
+                    file_id TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            logger.error(f"Error opening download tracking database: {e}")
+            return None
+    
+    def _load_tracking(self) -> None:
+        """Load persisted downloads whose files are still present and unchanged on disk."""
+        if self._tracking_db is None:
+            return
+        
+        stale = []
+        try:
+            with self._lock:
+                rows = self._tracking_db.execute(
+                    "SELECT file_id, path, size, mtime, etag FROM downloads"
+                ).fetchall()
+            
+            for file_id, path, size, mtime, etag in rows:
+                file_path = Path(path)
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    stale.append(file_id)
+                    continue
+                
+                if stat.st_size != size or stat.st_mtime != mtime:
+                    stale.append(file_id)
+                    continue
+                
+                self.downloaded_files[file_id] = file_path
+                self._etags[file_id] = etag
+            
+            with self._lock:
+                self._uploaded.update(
+                    self._tracking_db.execute("SELECT file_id, etag FROM uploads").fetchall()
+                )
+            
+            logger.info(f"Restored {len(self.downloaded_files)} tracked downloads and {len(self._uploaded)} uploads")
+        except sqlite3.Error as e:
+            logger.error(f"Error loading download tracking: {e}")
+        
+        self._forget_records(stale)
+    
+    def _save_record(self, file_id: str, file_path: Path, etag: Optional[str]) -> None:
+        """
+        Persist the tracking entry for a completed download.
+        
+        Args:
+            file_id: The ID of the file.
+            file_path: Path to the downloaded file.
+            etag: Version tag of the downloaded content.
+        """
+        if self._tracking_db is None:
+            return
+        
+        try:
+            stat = file_path.stat()
+            with self._lock:
+                self._tracking_db.execute(
+                    "INSERT OR REPLACE INTO downloads (file_id, path, size, mtime, etag) VALUES (?, ?, ?, ?, ?)",
+                    (file_id, str(file_path), stat.st_size, stat.st_mtime, etag)
+                )
+                self._tracking_db.commit()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Error saving download tracking for {file_id}: {e}")
+    
+    def _forget_records(self, file_ids: List[str]) -> None:
+        """
+        Remove persisted tracking entries.
+        
+        Args:
+            file_ids: The IDs of the files to forget.
+        """
+        if self._tracking_db is None or not file_ids:
+            return
+        
+        try:
+            with self._lock:
+                self._tracking_db.executemany(
+                    "DELETE FROM downloads WHERE file_id = ?",
+                    [(file_id,) for file_id in file_ids]
+                )
+                self._tracking_db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error removing download tracking: {e}")
+    
+    def is_in_sync(self, file_data: FileDict) -> bool:
+        """
+        Check whether this version of a file has already been uploaded.
+        
+        Args:
+            file_data: File metadata dictionary.
+            
+        Returns:
+            True if the uploaded content matches the file's version tag.
+        """
+        etag = self._etag(file_data)
+        with self._lock:
+            return etag is not None and self._uploaded.get(file_data['id']) == etag
+    
+    def mark_uploaded(self, file_data: FileDict) -> None:
+        """
+        Record the version of a file that was uploaded.
+        
+        Args:
+            file_data: File metadata dictionary.
+        """
+        file_id = file_data['id']
+        etag = self._etag(file_data)
+        if etag is None:
+            return
+        
+        with self._lock:
+            self._uploaded[file_id] = etag
+            if self._tracking_db is None:
+                return
+            try:
+                self._tracking_db.execute(
+                    "INSERT OR REPLACE INTO uploads (file_id, etag) VALUES (?, ?)",
+                    (file_id, etag)
+                )
+                self._tracking_db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error saving upload tracking for {file_id}: {e}")
+    
+    def forget_uploads(self, file_ids: List[str]) -> None:
+        """
+        Remove the upload records of files, e.g. after they were deleted.
+        
+        Args:
+            file_ids: The IDs of the files to forget.
+        """
+        if not file_ids:
+            return
+        
+        with self._lock:
+            for file_id in file_ids:
+                self._uploaded.pop(file_id, None)
+            if self._tracking_db is None:
+                return
+            try:
+                self._tracking_db.executemany(
+                    "DELETE FROM uploads WHERE file_id = ?",
+                    [(file_id,) for file_id in file_ids]
+                )
+                self._tracking_db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error removing upload tracking: {e}")
+    
+    @staticmethod
+    def _etag(file_data: FileDict) -> Optional[str]:
+        """
+        Get the version tag identifying a file's content.
+        
+        Args:
+            file_data: File metadata dictionary.
+            
+        Returns:
+            The md5 checksum, falling back to the modified time, or None.
+        """
+        return file_data.get('md5Checksum') or file_data.get('modifiedTime')
     
     def download_file(self, file_data: Dict[str, Any]) -> Optional[Path]:
         """
@@ -66,49 +293,59 @@ class DownloadManager:
         
         logger.info(f"Downloading file: {file_name} ({file_id})")
         
-        # Create a safe filename
-        safe_name = self._create_safe_filename(file_name)
+        # Create a safe filename; prefixing the file ID makes it unique by construction
+        safe_name = self._create_safe_filename(file_name, prefix=f"{file_id}__")
         
         # Create output path
-        output_path = self.download_dir / safe_name
+        output_name = os.path.join(self._download_dir_str, safe_name)
+        
+        # Check if this version of the file is already downloaded
+        etag = self._etag(file_data)
+        with self._lock:
+            existing_path = self.downloaded_files.get(file_id)
+            existing_etag = self._etags.get(file_id)
+        existing = existing_path is not None and os.path.exists(existing_path)
+        if existing and (etag is None or existing_etag is None or etag == existing_etag):
+            logger.debug(f"File {file_name} already downloaded to {existing_path}")
+            return existing_path
         
-        # Check if file is already downloaded
-        if file_id in self.downloaded_files:
-            existing_path = self.downloaded_files[file_id]
-            if existing_path.exists():
-                logger.debug(f"File {file_name} already downloaded to {existing_path}")
-                return existing_path
+        # Drop a stale copy of an older version before downloading the new one
+        if existing:
+            try:
+                os.unlink(existing_path)
+                logger.debug(f"Removed outdated download of {file_name}: {existing_path}")
+            except OSError as e:
+                logger.warning(f"Could not remove outdated download {existing_path}: {e}")
         
         # Download the file
         try:
             logger.info(f"Downloading file: {file_name} ({file_id})")
             
-            # Ensure we have a unique filename
-            if output_path.exists():
-                base_name = output_path.stem
-                extension = output_path.suffix
-                counter = 1
-                while output_path.exists():
-                    output_path = self.download_dir / f"{base_name}_{counter}{extension}"
-                    counter += 1
-            
-            # Download the file
-            success = self.drive_client.download_file(file_id, output_path)
+            output_path = Path(output_name)
+            success = self.drive_client.download_file(
+                file_id,
+                output_path,
+                chunk_size=self.chunk_size,
+                expected_size=file_data.get('size')
+            )
             
             if success:
-                # Check if the file exists with a different extension (for Google Workspace files)
-                if not output_path.exists():
+                # Google Workspace exports are saved with the export format's
+                # extension, so only they need the directory lookup
+                if file_data.get('mimeType', '').startswith('application/vnd.google-apps.') and not os.path.exists(output_name):
                     # Look for files with the same stem but different extension
-                    parent_dir = output_path.parent
-                    file_stem = output_path.stem
-                    possible_files = list(parent_dir.glob(f"{file_stem}.*"))
+                    file_stem = os.path.basename(os.path.splitext(output_name)[0])
+                    possible_files = list(self.download_dir.glob(f"{glob.escape(file_stem)}.*"))
                     
                     if possible_files:
                         # Use the first matching file
                         output_path = possible_files[0]
                 
                 logger.info(f"File downloaded successfully to {output_path}")
-                self.downloaded_files[file_id] = output_path
+                with self._lock:
+                    self.downloaded_files[file_id] = output_path
+                    self._etags[file_id] = etag
+                self._save_record(file_id, output_path, etag)
                 return output_path
             else:
                 logger.error(f"Failed to download file {file_name} ({file_id})")
@@ -118,9 +355,34 @@ class DownloadManager:
             logger.exception(f"Error downloading file {file_name} ({file_id}): {e}")
             return None
     
+    def can_stream(self, file_data: Dict[str, Any]) -> bool:
+        """
+        Check whether a file can be streamed instead of downloaded.
+        
+        Args:
+            file_data: File metadata dictionary.
+            
+        Returns:
+            True for binary files, False for Google Workspace files that must be exported.
+        """
+        return not file_data.get('mimeType', '').startswith('application/vnd.google-apps.')
+    
+    def stream_file(self, file_data: Dict[str, Any]) -> Iterator[bytes]:
+        """
+        Stream a file from Google Drive without writing it to disk.
+        
+        Args:
+            file_data: File metadata dictionary.
+            
+        Returns:
+            Iterator over the file content in chunks of the configured size.
+        """
+        logger.info(f"Streaming file: {file_data.get('name')} ({file_data['id']})")
+        return self.drive_client.iter_file_chunks(file_data['id'], chunk_size=self.chunk_size)
+    
     def download_files(self, file_list: List[FileDict]) -> Dict[str, Path]:
         """
-        Download multiple files from Google Drive.
+        Download multiple files from Google Drive concurrently.
         
         Args:
             file_list: List of file metadata dictionaries.
@@ -130,12 +392,21 @@ class DownloadManager:
         """
         results = {}
         
-        for file_data in file_list:
-            file_id = file_data['id']
-            file_path = self.download_file(file_data)
+        if not file_list:
+            return results
+        
+        max_workers = min(self.max_concurrent_downloads, len(file_list))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.download_file, file_data): file_data['id']
+                for file_data in file_list
+            }
             
-            if file_path:
-                results[file_id] = file_path
+            for future in as_completed(futures):
+                file_path = future.result()
+                
+                if file_path:
+                    results[futures[future]] = file_path
         
         logger.info(f"Downloaded {len(results)} files out of {len(file_list)} requested")
         return results
@@ -149,7 +420,8 @@ class DownloadManager:
         Returns:
             Path to the downloaded file or None if not found.
         """
-        return self.downloaded_files.get(file_id)
+        with self._lock:
+            return self.downloaded_files.get(file_id)
         
     def remove_tracking(self, file_id: str) -> None:
         """Remove a file from the tracking dictionary.
@@ -157,8 +429,11 @@ class DownloadManager:
         Args:
             file_id: The ID of the file to remove.
         """
-        if file_id in self.downloaded_files:
-            del self.downloaded_files[file_id]
+        with self._lock:
+            removed = self.downloaded_files.pop(file_id, None)
+            self._etags.pop(file_id, None)
+        self._forget_records([file_id])
+        if removed is not None:
             logger.debug(f"Removed file {file_id} from tracking dictionary")
     
     def cleanup_old_files(self, max_age_seconds: int = 86400) -> int:
@@ -171,56 +446,87 @@ class DownloadManager:
         Returns:
             Number of files deleted.
         """
-        import time
-        
         now = time.time()
         deleted_count = 0
         to_delete = []
         
-        for file_id, file_path in self.downloaded_files.items():
-            if not file_path.exists():
-                to_delete.append(file_id)
-                continue
+        # Stat the whole download directory in a single pass
+        dir_entries = {}
+        try:
+            with os.scandir(self.download_dir) as it:
+                for entry in it:
+                    try:
+                        dir_entries[entry.name] = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.error(f"Error scanning download directory {self.download_dir}: {e}")
+            return 0
+        
+        with self._lock:
+            tracked_files = list(self.downloaded_files.items())
+        
+        for file_id, file_path in tracked_files:
+            stat = dir_entries.get(file_path.name)
+            if stat is None or file_path.parent != self.download_dir:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    to_delete.append(file_id)
+                    continue
                 
-            file_age = now - file_path.stat().st_mtime
+            file_age = now - stat.st_mtime
             if file_age > max_age_seconds:
                 try:
-                    file_path.unlink()
+                    os.unlink(file_path)
                     to_delete.append(file_id)
                     deleted_count += 1
                     logger.debug(f"Deleted old file: {file_path}")
+                except FileNotFoundError:
+                    to_delete.append(file_id)
                 except Exception as e:
                     logger.error(f"Error deleting file {file_path}: {e}")
         
         # Remove deleted files from tracking
-        for file_id in to_delete:
-            self.downloaded_files.pop(file_id, None)
+        with self._lock:
+            for file_id in to_delete:
+                self.downloaded_files.pop(file_id, None)
+                self._etags.pop(file_id, None)
+        self._forget_records(to_delete)
         
         logger.info(f"Cleaned up {deleted_count} old files")
         return deleted_count
     
-    def _create_safe_filename(self, filename: str) -> str:
+    def _create_safe_filename(self, filename: str, prefix: str = '') -> str:
         """
         Create a safe filename from the original filename.
         
+        The name is shortened, keeping its extension, so that the prefixed
+        name fits in MAX_FILENAME_BYTES encoded bytes.
+        
         Args:
             filename: Original filename.
+            prefix: Prefix to prepend to the filename.
             
         Returns:
-            Safe filename.
+            Safe filename, including the prefix.
         """
         # Replace invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        safe_name = filename
-        for char in invalid_chars:
-            safe_name = safe_name.replace(char, '_')
+        safe_name = filename.translate(INVALID_FILENAME_CHARS)
         
-        # Limit filename length
-        if len(safe_name) > 255:
+        # Limit filename length in encoded bytes
+        limit = MAX_FILENAME_BYTES - EXPORT_EXTENSION_BYTES - len(os.fsencode(prefix))
+        if len(os.fsencode(safe_name)) > limit:
             base, ext = os.path.splitext(safe_name)
-            safe_name = base[:255-len(ext)] + ext
+            ext_bytes = os.fsencode(ext)
+            if len(ext_bytes) > limit // 2:
+                # Not a real extension; cut the whole name instead
+                base, ext_bytes = safe_name, b''
+            base_bytes = os.fsencode(base)[:limit - len(ext_bytes)]
+            # Drop a multi-byte character cut in half
+            safe_name = base_bytes.decode(sys.getfilesystemencoding(), 'ignore') + os.fsdecode(ext_bytes)
             
-        return safe_name
+        return prefix + safe_name
     
     def clear_downloads(self) -> bool:
         """
@@ -230,10 +536,27 @@ class DownloadManager:
             True if successful, False otherwise.
         """
         try:
-            for file_id, file_path in list(self.downloaded_files.items()):
-                if file_path.exists():
-                    file_path.unlink()
-                self.downloaded_files.pop(file_id, None)
+            with self._lock:
+                # The tracking database lives in the download directory, so it
+                # is closed and recreated along with it
+                if self._tracking_db is not None:
+                    self._tracking_db.close()
+                
+                shutil.rmtree(self.download_dir, ignore_errors=True)
+                self.download_dir.mkdir(parents=True, exist_ok=True)
+                
+                self.downloaded_files.clear()
+                self._etags.clear()
+                self._tracking_db = self._open_tracking_db()
+                
+                # Upload records describe Dify, not the download directory, so
+                # they survive the reset
+                if self._tracking_db is not None and self._uploaded:
+                    self._tracking_db.executemany(
+                        "INSERT OR REPLACE INTO uploads (file_id, etag) VALUES (?, ?)",
+                        self._uploaded.items()
+                    )
+                    self._tracking_db.commit()
             
             logger.info("All downloaded files cleared")
             return True
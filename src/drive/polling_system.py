@@ -4,20 +4,36 @@ Polling system for Google Drive changes.
 This module provides a polling system to check for changes in Google Drive periodically.
 """
 
+import ssl
 import time
+import socket
 import logging
 import threading
+import http.client
 from datetime import datetime
 from typing import Dict, List, Tuple, Callable, Any, Optional, Union
 
+import httplib2
+
 logger = logging.getLogger(__name__)
 
 # Type definitions
 FileDict = Dict[str, Any]
 FileList = List[FileDict]
 CallbackFunc = Callable[[FileDict], None]
+BulkCallbackFunc = Callable[[FileList], None]
 PollCompleteCallbackFunc = Callable[[FileList, FileList, FileList], None]
-EventCallbacks = Dict[str, List[Union[CallbackFunc, PollCompleteCallbackFunc]]]
+EventCallbacks = Dict[str, List[Union[CallbackFunc, BulkCallbackFunc, PollCompleteCallbackFunc]]]
+
+# Network failures after which a manual poll reports no changes instead of failing
+TRANSIENT_NETWORK_ERRORS = (
+    ssl.SSLError,
+    socket.gaierror,
+    ConnectionError,
+    TimeoutError,
+    http.client.HTTPException,
+    httplib2.HttpLib2Error,
+)
 
 
 class PollingSystem:
@@ -28,26 +44,55 @@ class PollingSystem:
     EVENT_MODIFIED_FILE = 'modified_file'
     EVENT_DELETED_FILE = 'deleted_file'
     EVENT_POLL_COMPLETE = 'poll_complete'
+    # Bulk variants, called once per poll with the whole list of files
+    EVENT_NEW_FILES_BULK = 'new_files_bulk'
+    EVENT_MODIFIED_FILES_BULK = 'modified_files_bulk'
+    EVENT_DELETED_FILES_BULK = 'deleted_files_bulk'
     
-    def __init__(self, change_detector, interval: int = 300):
+    def __init__(self, change_detector, interval: int = 300, max_interval: Optional[int] = None):
         """
         Initialize the polling system.
         
         Args:
             change_detector: The change detector instance.
             interval: The polling interval in seconds (default: 300).
+            max_interval: The longest interval set_next_interval may back off to
+                          (default: interval, i.e. no backoff).
         """
         self.change_detector = change_detector
         self.interval = interval
+        self.max_interval = max(max_interval or interval, interval)
+        # Wait before the next poll, adjusted through set_next_interval
+        self.next_interval = interval
         self.running = False
         self.thread: Optional[threading.Thread] = None
-        self.last_poll_time: Optional[datetime] = None
+        # Set to cut short the wait between polls, either to stop or to poll early
+        self._wake_event = threading.Event()
+        # Poll times are recorded on the monotonic clock and converted to
+        # wall-clock time against these anchors only when reported
+        self._last_poll_monotonic: Optional[float] = None
+        self._wall_anchor = time.time()
+        self._monotonic_anchor = time.monotonic()
         self.callbacks: EventCallbacks = {
             self.EVENT_NEW_FILE: [],
             self.EVENT_MODIFIED_FILE: [],
             self.EVENT_DELETED_FILE: [],
-            self.EVENT_POLL_COMPLETE: []
+            self.EVENT_POLL_COMPLETE: [],
+            self.EVENT_NEW_FILES_BULK: [],
+            self.EVENT_MODIFIED_FILES_BULK: [],
+            self.EVENT_DELETED_FILES_BULK: []
         }
+        # Exception-safe wrappers of the callbacks above, index for index
+        self._safe_callbacks: EventCallbacks = {event_type: [] for event_type in self.callbacks}
+    
+    @property
+    def last_poll_time(self) -> Optional[datetime]:
+        """The wall-clock time of the last poll, or None if no poll has run."""
+        if self._last_poll_monotonic is None:
+            return None
+        return datetime.fromtimestamp(
+            self._wall_anchor + (self._last_poll_monotonic - self._monotonic_anchor)
+        )
     
     def start(self) -> bool:
         """
@@ -61,11 +106,12 @@ class PollingSystem:
             return False
         
         self.running = True
+        self._wake_event.clear()
         self.thread = threading.Thread(target=self._polling_loop)
         self.thread.daemon = True
         self.thread.start()
         
-        logger.info(f"Polling system started with interval of {self.interval} seconds")
+        logger.info("Polling system started with interval of %s seconds", self.interval)
         return True
     
     def stop(self) -> bool:
@@ -80,8 +126,12 @@ class PollingSystem:
             return False
         
         self.running = False
+        self._wake_event.set()
         if self.thread:
+            # Returns at once when idle; only an in-flight poll can delay it
             self.thread.join(timeout=5.0)
+            if self.thread.is_alive():
+                logger.warning("Polling thread is still finishing a poll; it will exit afterwards")
         
         logger.info("Polling system stopped")
         return True
@@ -94,12 +144,24 @@ class PollingSystem:
             event_type: The event type.
             files: List of file metadata dictionaries.
         """
-        for file in files:
-            for callback in self.callbacks[event_type]:
-                try:
-                    callback(file)  # type: ignore
-                except Exception as e:
-                    logger.error(f"Error in {event_type} callback: {e}")
+        callbacks = self._safe_callbacks[event_type]
+        if not callbacks or not files:
+            return
+        
+        for callback in callbacks:
+            for file in files:
+                callback(file)  # type: ignore
+    
+    def _trigger_bulk_callbacks(self, event_type: str, files: FileList) -> None:
+        """
+        Trigger bulk callbacks for a specific event type with the whole list of files.
+        
+        Args:
+            event_type: The bulk event type.
+            files: List of file metadata dictionaries.
+        """
+        for callback in self._safe_callbacks[event_type]:
+            callback(files)  # type: ignore
     
     def _trigger_poll_complete_callbacks(
         self, new_files: FileList, modified_files: FileList, deleted_files: FileList
@@ -112,40 +174,91 @@ class PollingSystem:
             modified_files: List of modified file metadata.
             deleted_files: List of deleted file metadata.
         """
-        for callback in self.callbacks[self.EVENT_POLL_COMPLETE]:
-            try:
-                callback(new_files, modified_files, deleted_files)  # type: ignore
-            except Exception as e:
-                logger.error(f"Error in poll_complete callback: {e}")
+        for callback in self._safe_callbacks[self.EVENT_POLL_COMPLETE]:
+            callback(new_files, modified_files, deleted_files)  # type: ignore
+    
+    def _dispatch_changes(
+        self, new_files: FileList, modified_files: FileList, deleted_files: FileList
+    ) -> None:
+        """
+        Trigger the callbacks for the results of a poll.
+        
+        Per-file and bulk callbacks are skipped entirely when nothing changed.
+        
+        Args:
+            new_files: List of new file metadata.
+            modified_files: List of modified file metadata.
+            deleted_files: List of deleted file metadata.
+        """
+        if new_files:
+            self._trigger_bulk_callbacks(self.EVENT_NEW_FILES_BULK, new_files)
+            self._trigger_callbacks(self.EVENT_NEW_FILE, new_files)
+        if modified_files:
+            self._trigger_bulk_callbacks(self.EVENT_MODIFIED_FILES_BULK, modified_files)
+            self._trigger_callbacks(self.EVENT_MODIFIED_FILE, modified_files)
+        if deleted_files:
+            self._trigger_bulk_callbacks(self.EVENT_DELETED_FILES_BULK, deleted_files)
+            self._trigger_callbacks(self.EVENT_DELETED_FILE, deleted_files)
+        
+        self._trigger_poll_complete_callbacks(new_files, modified_files, deleted_files)
     
     def _polling_loop(self) -> None:
         """Main polling loop that runs in a separate thread."""
+        # Bind the per-iteration lookups once
+        detect_changes = self.change_detector.detect_changes
+        dispatch_changes = self._dispatch_changes
+        wake_event = self._wake_event
+        monotonic = time.monotonic
+        
         while self.running:
             try:
                 logger.debug("Polling for changes...")
-                self.last_poll_time = datetime.now()
+                self._last_poll_monotonic = monotonic()
                 
                 # Detect changes
-                new_files, modified_files, deleted_files = self.change_detector.detect_changes()
+                new_files, modified_files, deleted_files = detect_changes()
                 
                 # Trigger callbacks
-                self._trigger_callbacks(self.EVENT_NEW_FILE, new_files)
-                self._trigger_callbacks(self.EVENT_MODIFIED_FILE, modified_files)
-                self._trigger_callbacks(self.EVENT_DELETED_FILE, deleted_files)
-                self._trigger_poll_complete_callbacks(new_files, modified_files, deleted_files)
+                dispatch_changes(new_files, modified_files, deleted_files)
                 
-                logger.info(f"Polling complete. Next poll in {self.interval} seconds")
+                logger.info("Polling complete. Next poll in %s seconds", self.next_interval)
                 
-                # Sleep until next poll, checking every second if we should stop
-                for _ in range(self.interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                # Wait until the next poll, waking early on stop() or request_poll()
+                wake_event.wait(self.next_interval)
+                wake_event.clear()
                     
             except Exception as e:
                 logger.error(f"Error in polling loop: {e}")
-                # Sleep for a short time before retrying
-                time.sleep(10)
+                # Wait a short time before retrying
+                wake_event.wait(10)
+                wake_event.clear()
+    
+    def set_next_interval(self, seconds: float) -> float:
+        """
+        Set the wait before the next poll.
+        
+        Args:
+            seconds: The requested interval, clamped to [interval, max_interval].
+            
+        Returns:
+            The interval that was set.
+        """
+        self.next_interval = min(max(seconds, self.interval), self.max_interval)
+        return self.next_interval
+    
+    def request_poll(self) -> bool:
+        """
+        Ask the polling thread to poll immediately instead of waiting out the interval.
+        
+        Returns:
+            True if the request was made, False if the polling system is not running.
+        """
+        if not self.running:
+            logger.warning("Polling system is not running")
+            return False
+        
+        self._wake_event.set()
+        return True
     
     def poll_now(self) -> Optional[Tuple[FileList, FileList, FileList]]:
         """
@@ -156,27 +269,20 @@ class PollingSystem:
         """
         try:
             logger.info("Manual polling triggered")
-            self.last_poll_time = datetime.now()
+            self._last_poll_monotonic = time.monotonic()
             
             # Detect changes
             try:
                 new_files, modified_files, deleted_files = self.change_detector.detect_changes()
-            except Exception as e:
+            except TRANSIENT_NETWORK_ERRORS as e:
                 # Handle SSL errors and other connection issues
-                if 'SSL' in str(e) or 'socket' in str(e) or 'connection' in str(e).lower():
-                    logger.error(f"Network or SSL error during polling: {e}")
-                    logger.info("Returning empty results due to connection error")
-                    # Return empty lists instead of None to avoid unpacking errors
-                    return [], [], []
-                else:
-                    # Re-raise other exceptions
-                    raise
+                logger.error(f"Network or SSL error during polling: {e}")
+                logger.info("Returning empty results due to connection error")
+                # Return empty lists instead of None to avoid unpacking errors
+                return [], [], []
             
             # Trigger callbacks
-            self._trigger_callbacks(self.EVENT_NEW_FILE, new_files)
-            self._trigger_callbacks(self.EVENT_MODIFIED_FILE, modified_files)
-            self._trigger_callbacks(self.EVENT_DELETED_FILE, deleted_files)
-            self._trigger_poll_complete_callbacks(new_files, modified_files, deleted_files)
+            self._dispatch_changes(new_files, modified_files, deleted_files)
             
             return new_files, modified_files, deleted_files
         except Exception as e:
@@ -189,7 +295,8 @@ class PollingSystem:
         Register a callback for an event.
         
         Args:
-            event_type: The event type ('new_file', 'modified_file', 'deleted_file', 'poll_complete').
+            event_type: The event type ('new_file', 'modified_file', 'deleted_file', 'poll_complete',
+                        or the bulk 'new_files_bulk', 'modified_files_bulk', 'deleted_files_bulk').
             callback: The callback function.
             
         Returns:
@@ -204,9 +311,30 @@ class PollingSystem:
             return False
         
         self.callbacks[event_type].append(callback)  # type: ignore
-        logger.debug(f"Registered callback for event: {event_type}")
+        self._safe_callbacks[event_type].append(self._make_safe(event_type, callback))
+        logger.debug("Registered callback for event: %s", event_type)
         return True
     
+    @staticmethod
+    def _make_safe(event_type: str, callback: Callable) -> Callable:
+        """
+        Wrap a callback so that its exceptions are logged instead of raised.
+        
+        Args:
+            event_type: The event type, used in the error message.
+            callback: The callback function.
+            
+        Returns:
+            The wrapped callback.
+        """
+        def safe_callback(*args):
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Error in {event_type} callback: {e}")
+        
+        return safe_callback
+    
     def unregister_callback(self, event_type: str, callback: Union[CallbackFunc, PollCompleteCallbackFunc]) -> bool:
         """
         Unregister a callback for an event.
@@ -224,8 +352,10 @@ class PollingSystem:
         
         callback_list = self.callbacks[event_type]
         if callback in callback_list:
-            callback_list.remove(callback)  # type: ignore
-            logger.debug(f"Unregistered callback for event: {event_type}")
+            index = callback_list.index(callback)  # type: ignore
+            del callback_list[index]
+            del self._safe_callbacks[event_type][index]
+            logger.debug("Unregistered callback for event: %s", event_type)
             return True
         
         logger.warning(f"Callback not found for event: {event_type}")
@@ -241,7 +371,8 @@ class PollingSystem:
         return {
             'running': self.running,
             'interval': self.interval,
-            'last_poll_time': self.last_poll_time.isoformat() if self.last_poll_time else None,
+            'next_interval': self.next_interval,
+            'last_poll_time': self.last_poll_time.isoformat() if self._last_poll_monotonic is not None else None,
             'registered_callbacks': {
                 event_type: len(callbacks)
                 for event_type, callbacks in self.callbacks.items()
@@ -6,27 +6,48 @@ This module handles authentication with the Google Drive API using a service acc
 
 import os
 import logging
+from functools import lru_cache
 from pathlib import Path
+import httplib2
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 
 logger = logging.getLogger(__name__)
 
 # Define the scopes
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+# Socket timeout in seconds for Drive API connections
+HTTP_TIMEOUT = 60
+
+
+@lru_cache(maxsize=1)
+def _drive_discovery_document():
+    """
+    Load the Drive v3 discovery document bundled with google-api-python-client.
+    
+    Returns:
+        str: The discovery document, or None if it is not bundled.
+    """
+    return get_static_doc('drive', 'v3')
+
 
 class DriveServiceAuth:
     """Google Drive API authentication handler using service account."""
     
-    def __init__(self, service_account_file):
+    def __init__(self, service_account_file, cache_dir=None):
         """
         Initialize the authentication handler.
         
         Args:
             service_account_file (str): Path to the service account JSON file.
+            cache_dir (str, optional): Directory for httplib2's on-disk HTTP
+                                       cache. No responses are cached if None.
         """
         self.service_account_file = Path(service_account_file)
+        self.cache_dir = str(cache_dir) if cache_dir else None
         self.credentials = None
         self.service = None
     
@@ -57,11 +78,23 @@ class DriveServiceAuth:
         """
         Build and return the Google Drive service.
         
+        The service gets its own authorized keep-alive connection, which is
+        reused by every request made through it.
+        
         Returns:
             googleapiclient.discovery.Resource: The Google Drive service.
         """
         logger.debug("Building Google Drive service with service account")
-        self.service = build('drive', 'v3', credentials=self.credentials)
+        http = AuthorizedHttp(
+            self.credentials,
+            http=httplib2.Http(cache=self.cache_dir, timeout=HTTP_TIMEOUT)
+        )
+        
+        document = _drive_discovery_document()
+        if document is not None:
+            self.service = build_from_document(document, http=http)
+        else:
+            self.service = build('drive', 'v3', http=http, cache_discovery=False)
         return self.service
     
     def get_service(self):
@@ -4,17 +4,85 @@ Google Drive client module using service account authentication.
 This module provides functionality to interact with Google Drive using a service account.
 """
 
+import io
 import os
+import json
+import time
 import logging
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
 from googleapiclient.http import MediaIoBaseDownload
 from googleapiclient.errors import HttpError
 
-from src.drive.service_auth import DriveServiceAuth
+from src.drive.service_auth import DriveServiceAuth, HTTP_TIMEOUT
+from src.utils.rate_limiter import TokenBucket
+
+# orjson is optional; without it folder listings are parsed with the json module
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    orjson = None
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Download chunk size; much larger than MediaIoBaseDownload's 100 KiB default
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Retries, with exponential backoff, for rate-limited or failed Drive requests
+NUM_RETRIES = 5
+
+# Folder listings sent per batch HTTP request (Drive allows up to 100)
+LIST_BATCH_SIZE = 100
+
+# Batch requests sent concurrently while listing a tree
+LIST_WORKERS = 10
+
+# Files returned per folder listing page when listing a whole tree
+LIST_ALL_PAGE_SIZE = 1000
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Drive REST endpoint used for single folder listings
+DRIVE_FILES_URL = 'https://www.googleapis.com/drive/v3/files'
+
+# Google APIs only gzip responses for clients whose user agent contains "gzip"
+LIST_HEADERS = {
+    'Accept-Encoding': 'gzip',
+    'User-Agent': 'gdrive-sync (gzip)'
+}
+
+# Downloads started per second, kept under Drive's per-user request quota
+DOWNLOAD_RATE = 9
+DOWNLOAD_BURST = 10
+
+# Maximum number of file metadata entries kept in memory
+METADATA_CACHE_SIZE = 4096
+
+# File metadata fields requested from Drive: just the columns used downstream
+FILE_FIELDS = "id, name, mimeType, modifiedTime, size, md5Checksum, parents"
+LIST_FIELDS = f"nextPageToken, files({FILE_FIELDS})"
+
+# Listing fields for callers that only walk the folder tree
+TREE_FIELDS = "nextPageToken, files(id, name, mimeType)"
+
+# Changes returned per changes feed page (the Drive maximum)
+CHANGES_PAGE_SIZE = 1000
+CHANGES_FIELDS = (
+    "nextPageToken, newStartPageToken, changes(fileId, removed, "
+    f"file({FILE_FIELDS}, trashed))"
+)
+
 
 class ServiceDriveClient:
     """Google Drive client using service account authentication."""
@@ -30,17 +98,78 @@ class ServiceDriveClient:
         self.folder_id = config.get('google_drive.folder_id')
         service_account_file = config.get_service_account_path()
         
-        self.auth = DriveServiceAuth(service_account_file)
-        self.service = None
+        self.auth = DriveServiceAuth(
+            service_account_file,
+            cache_dir=config.get('google_drive.http_cache_dir')
+        )
+        
+        # The underlying httplib2 transport is not thread-safe, so each
+        # thread gets its own service object
+        self._local = threading.local()
+        
+        # Paces downloads across all threads
+        self.download_limiter = TokenBucket(
+            rate=config.get('google_drive.downloads_per_second', DOWNLOAD_RATE),
+            capacity=DOWNLOAD_BURST
+        )
+        
+        # Worker pool reused across polls so its threads, and the Drive
+        # connections those threads hold, stay warm
+        self.io_workers = config.get('google_drive.io_workers', LIST_WORKERS)
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=self.io_workers,
+            thread_name_prefix='drive-io'
+        )
+        
+        # Keep-alive session for folder listings, which skip googleapiclient's
+        # response decoding; the lock serializes credential refreshes
+        retry = Retry(
+            total=NUM_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=self.io_workers, pool_maxsize=self.io_workers, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('https://', adapter)
+        self._session.headers.update(LIST_HEADERS)
+        self._token_lock = threading.Lock()
+        
+        # File metadata keyed by file ID, as (expiry time, metadata) pairs,
+        # kept for one polling interval and shared by all threads
+        self.metadata_ttl = config.get('google_drive.polling_interval', 300)
+        
+        # IDs of the configured folder and all its subfolders, as of the
+        # last full listing of the configured folder
+        self.tree_folder_ids = frozenset()
+        self._meta_cache = {}
+        self._meta_lock = threading.Lock()
+    
+    @property
+    def service(self):
+        """The Google Drive service for the current thread, or None."""
+        return getattr(self._local, 'service', None)
+    
+    @service.setter
+    def service(self, value):
+        self._local.service = value
     
     def connect(self):
         """
         Connect to the Google Drive API.
         
+        Credentials are loaded once; later calls from other threads only
+        build a new service object for the calling thread.
+        
         Returns:
             bool: True if connection is successful, False otherwise.
         """
         try:
+            if self.auth.credentials is not None:
+                self.service = self.auth.build_service()
+                logger.debug("Built Google Drive service for thread %s", threading.get_ident())
+                return True
+            
             self.service = self.auth.authenticate()
             logger.info("Successfully connected to Google Drive API with service account")
             return True
@@ -48,7 +177,18 @@ class ServiceDriveClient:
             logger.error(f"Failed to connect to Google Drive API: {e}")
             return False
     
-    def list_files(self, folder_id=None, page_size=100, page_token=None):
+    def close(self):
+        """Shut down the worker pool, waiting for running tasks to finish, and the listing session."""
+        self._io_pool.shutdown(wait=True)
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def list_files(self, folder_id=None, page_size=100, page_token=None, fields=LIST_FIELDS):
         """
         List files in a folder.
         
@@ -57,6 +197,8 @@ class ServiceDriveClient:
                                       If None, uses the configured folder_id.
             page_size (int, optional): The maximum number of files to return per page.
             page_token (str, optional): The page token for pagination.
+            fields (str, optional): The listing fields to request. Only
+                                   listings with LIST_FIELDS are cached.
         
         Returns:
             tuple: (files, next_page_token) where files is a list of file metadata
@@ -72,23 +214,48 @@ class ServiceDriveClient:
             # Query for files in the specified folder
             query = f"'{folder_id}' in parents and trashed = false"
             
-            results = self.service.files().list(
-                q=query,
-                pageSize=page_size,
-                fields="nextPageToken, files(id, name, mimeType, modifiedTime, size)",
-                pageToken=page_token
-            ).execute()
+            params = {
+                'q': query,
+                'pageSize': page_size,
+                'fields': fields
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            
+            response = self._session.get(
+                DRIVE_FILES_URL,
+                params=params,
+                headers={'Authorization': f"Bearer {self._access_token()}"},
+                timeout=HTTP_TIMEOUT
+            )
+            response.raise_for_status()
+            results = _json_loads(response.content)
             
             files = results.get('files', [])
             next_page_token = results.get('nextPageToken')
+            if fields == LIST_FIELDS:
+                self._cache_metadata(files)
             
-            logger.debug(f"Found {len(files)} files in folder {folder_id}")
+            logger.debug("Found %d files in folder %s", len(files), folder_id)
             return files, next_page_token
         
-        except HttpError as error:
+        except (requests.RequestException, RefreshError, ValueError) as error:
             logger.error(f"Error listing files: {error}")
             return [], None
     
+    def _access_token(self):
+        """
+        Get a valid OAuth access token for direct Drive REST calls.
+        
+        Returns:
+            str: The access token, refreshed first if it has expired.
+        """
+        with self._token_lock:
+            credentials = self.auth.credentials
+            if not credentials.valid:
+                credentials.refresh(Request(self._session))
+            return credentials.token
+    
     def list_all_files(self, folder_id=None):
         """
         List all files in a folder and its subfolders.
@@ -100,44 +267,256 @@ class ServiceDriveClient:
         Returns:
             list: A list of file metadata.
         """
+        if not self.service:
+            if not self.connect():
+                return []
+        
         folder_id = folder_id or self.folder_id
         all_files = []
-        folders_to_process = [folder_id]
-        processed_folders = set()
+        processed_folders = {folder_id}
         
-        while folders_to_process:
-            current_folder = folders_to_process.pop(0)
+        # (folder_id, page_token) listings still to fetch
+        pending = deque([(folder_id, None)])
+        
+        def collect(current_folder, files, next_page_token):
+            for file in files:
+                # If it's a folder, add it to the list of folders to process
+                if file['mimeType'] == FOLDER_MIME_TYPE:
+                    if file['id'] not in processed_folders:
+                        processed_folders.add(file['id'])
+                        pending.append((file['id'], None))
+                else:
+                    all_files.append(file)
             
-            if current_folder in processed_folders:
-                continue
+            if next_page_token:
+                pending.append((current_folder, next_page_token))
+        
+        # List folders breadth-first. Each wave of pending listings is split
+        # into batch HTTP requests that are sent concurrently
+        while pending:
+            wave = [pending.popleft() for _ in range(min(len(pending), LIST_BATCH_SIZE * self.io_workers))]
+            batch_size = min(LIST_BATCH_SIZE, -(-len(wave) // self.io_workers))
+            batches = [wave[i:i + batch_size] for i in range(0, len(wave), batch_size)]
             
-            processed_folders.add(current_folder)
+            for results in self._io_pool.map(self._list_folder_batch, batches):
+                for current_folder, files, next_page_token in results:
+                    collect(current_folder, files, next_page_token)
+        
+        if folder_id == self.folder_id:
+            self.tree_folder_ids = frozenset(processed_folders)
+        
+        logger.info("Found %d files in folder %s and its subfolders", len(all_files), folder_id)
+        return all_files
+    
+    def list_files_batch(self, folder_ids, fields=LIST_FIELDS):
+        """
+        List the direct children of several folders with batch HTTP requests.
+        
+        Up to LIST_BATCH_SIZE listings share one HTTP request, and the
+        requests are sent concurrently. Further pages of the folders in a
+        batch are requested as soon as that batch completes, while the
+        other batches are still in flight.
+        
+        Args:
+            folder_ids (list): The IDs of the folders to list.
+            fields (str, optional): The listing fields to request.
+        
+        Returns:
+            dict: Mapping of folder ID to the metadata of all files in it.
+        """
+        results = {folder_id: [] for folder_id in folder_ids}
+        pending = [(folder_id, None) for folder_id in results]
+        list_batch = partial(self._list_folder_batch, fields=fields)
+        running = set()
+        
+        while pending or running:
+            if pending:
+                batch_size = min(LIST_BATCH_SIZE, -(-len(pending) // self.io_workers))
+                for i in range(0, len(pending), batch_size):
+                    running.add(self._io_pool.submit(list_batch, pending[i:i + batch_size]))
+                pending = []
             
-            # List files in the current folder
-            page_token = None
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                for current_folder, files, next_page_token in future.result():
+                    results[current_folder].extend(files)
+                    if next_page_token:
+                        pending.append((current_folder, next_page_token))
+        
+        return results
+    
+    def get_start_page_token(self):
+        """
+        Get the changes feed position for changes made from now on.
+        
+        Returns:
+            str: The start page token or None if it cannot be fetched.
+        """
+        if not self.service:
+            if not self.connect():
+                return None
+        
+        try:
+            response = self.service.changes().getStartPageToken().execute(num_retries=NUM_RETRIES)
+            return response.get('startPageToken')
+        except HttpError as error:
+            logger.error(f"Error getting changes start page token: {error}")
+            return None
+    
+    def list_changes(self, page_token):
+        """
+        List all changes visible to the service account since a page token.
+        
+        Args:
+            page_token (str): Token from get_start_page_token or a previous call.
+        
+        Returns:
+            tuple: (changes, new_start_page_token), or (None, None) if listing fails.
+        """
+        if not self.service:
+            if not self.connect():
+                return None, None
+        
+        changes = []
+        try:
             while True:
-                files, page_token = self.list_files(current_folder, page_token=page_token)
-                
-                for file in files:
-                    # If it's a folder, add it to the list of folders to process
-                    if file['mimeType'] == 'application/vnd.google-apps.folder':
-                        folders_to_process.append(file['id'])
-                    else:
-                        all_files.append(file)
+                response = self.service.changes().list(
+                    pageToken=page_token,
+                    pageSize=CHANGES_PAGE_SIZE,
+                    includeRemoved=True,
+                    fields=CHANGES_FIELDS
+                ).execute(num_retries=NUM_RETRIES)
                 
-                if not page_token:
+                changes.extend(response.get('changes', []))
+                if 'newStartPageToken' in response:
                     break
+                page_token = response['nextPageToken']
+        except HttpError as error:
+            logger.error(f"Error listing changes: {error}")
+            return None, None
         
-        logger.info(f"Found {len(all_files)} files in folder {folder_id} and its subfolders")
-        return all_files
+        self._cache_metadata([change['file'] for change in changes if change.get('file')])
+        
+        logger.debug("Found %d changes", len(changes))
+        return changes, response['newStartPageToken']
     
-    def download_file(self, file_id, output_path):
+    def watch_changes(self, channel_id, address, token=None, expiration=None):
+        """
+        Register a web hook notification channel for the changes feed.
+        
+        Args:
+            channel_id (str): Unique ID for the channel.
+            address (str): HTTPS URL that Drive sends notifications to.
+            token (str, optional): Secret echoed back in the X-Goog-Channel-Token header.
+            expiration (float, optional): Requested expiry as a Unix timestamp.
+        
+        Returns:
+            dict: The channel (id, resourceId, expiration) or None if registration fails.
+        """
+        page_token = self.get_start_page_token()
+        if not page_token:
+            return None
+        
+        body = {'id': channel_id, 'type': 'web_hook', 'address': address}
+        if token:
+            body['token'] = token
+        if expiration:
+            body['expiration'] = int(expiration * 1000)
+        
+        try:
+            return self.service.changes().watch(pageToken=page_token, body=body).execute(num_retries=NUM_RETRIES)
+        except HttpError as error:
+            logger.error(f"Error registering changes notification channel: {error}")
+            return None
+    
+    def stop_channel(self, channel_id, resource_id):
+        """
+        Stop a notification channel.
+        
+        Args:
+            channel_id (str): The channel ID.
+            resource_id (str): The resource ID returned when the channel was registered.
+        
+        Returns:
+            bool: True if the channel was stopped, False otherwise.
+        """
+        if not self.service:
+            if not self.connect():
+                return False
+        
+        try:
+            self.service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}).execute(num_retries=NUM_RETRIES)
+            return True
+        except HttpError as error:
+            logger.error(f"Error stopping notification channel {channel_id}: {error}")
+            return False
+    
+    def _list_folder_batch(self, listings, fields=LIST_FIELDS):
+        """
+        Fetch several folder listing pages with one batch HTTP request.
+        
+        Args:
+            listings (list): (folder_id, page_token) pairs to fetch.
+            fields (str, optional): The listing fields to request.
+        
+        Returns:
+            list: (folder_id, files, next_page_token) tuples, one per listing.
+        """
+        if not self.service:
+            if not self.connect():
+                return []
+        
+        results = []
+        failed = []
+        
+        def on_result(request_id, response, exception):
+            current_folder, page_token = listings[int(request_id)]
+            if exception is not None:
+                logger.warning(f"Batched listing of folder {current_folder} failed: {exception}")
+                failed.append((current_folder, page_token))
+                return
+            files = response.get('files', [])
+            if fields == LIST_FIELDS:
+                self._cache_metadata(files)
+            results.append((current_folder, files, response.get('nextPageToken')))
+        
+        batch = self.service.new_batch_http_request(callback=on_result)
+        for request_id, (current_folder, page_token) in enumerate(listings):
+            batch.add(
+                self.service.files().list(
+                    q=f"'{current_folder}' in parents and trashed = false",
+                    pageSize=LIST_ALL_PAGE_SIZE,
+                    fields=fields,
+                    pageToken=page_token
+                ),
+                request_id=str(request_id)
+            )
+        
+        try:
+            batch.execute()
+        except HttpError as error:
+            logger.warning(f"Batched folder listing failed: {error}")
+            results = []
+            failed = list(listings)
+        
+        # Fall back to individual requests, which retry with backoff
+        for current_folder, page_token in failed:
+            files, next_page_token = self.list_files(
+                current_folder, page_size=LIST_ALL_PAGE_SIZE, page_token=page_token, fields=fields
+            )
+            results.append((current_folder, files, next_page_token))
+        
+        return results
+    
+    def download_file(self, file_id, output_path, chunk_size=DEFAULT_CHUNK_SIZE, expected_size=None):
         """
         Download a file from Google Drive.
         
         Args:
             file_id (str): The ID of the file to download.
             output_path (str or Path): The path where the file will be saved.
+            chunk_size (int, optional): Bytes requested per chunk and used as the write buffer size.
+            expected_size (int, optional): Known file size, used to preallocate the output file.
         
         Returns:
             bool: True if download is successful, False otherwise.
@@ -149,9 +528,12 @@ class ServiceDriveClient:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        self.download_limiter.acquire()
+        
         try:
-            # Get file metadata to check if it's a Google Workspace file
-            file_metadata = self.get_file_metadata(file_id)
+            # Get file metadata to check if it's a Google Workspace file; a
+            # recent listing usually has it already
+            file_metadata = self._get_cached_metadata(file_id) or self.get_file_metadata(file_id)
             if not file_metadata:
                 logger.error(f"Could not get metadata for file {file_id}")
                 return False
@@ -160,26 +542,66 @@ class ServiceDriveClient:
             
             # Handle Google Workspace files (Docs, Sheets, Slides)
             if mime_type.startswith('application/vnd.google-apps.'):
-                return self._export_google_workspace_file(file_id, mime_type, output_path)
+                return self._export_google_workspace_file(file_id, mime_type, output_path, chunk_size)
             
             # Regular file download
             request = self.service.files().get_media(fileId=file_id)
             
-            with open(output_path, 'wb') as f:
-                downloader = MediaIoBaseDownload(f, request)
+            with open(output_path, 'wb', buffering=chunk_size) as f:
+                if expected_size:
+                    self._preallocate(f, int(expected_size))
+                downloader = MediaIoBaseDownload(f, request, chunksize=chunk_size)
+                debug_enabled = logger.isEnabledFor(logging.DEBUG)
                 done = False
                 while not done:
-                    status, done = downloader.next_chunk()
-                    logger.debug(f"Download progress: {int(status.progress() * 100)}%")
+                    status, done = downloader.next_chunk(num_retries=NUM_RETRIES)
+                    if debug_enabled:
+                        logger.debug("Download progress: %d%%", int(status.progress() * 100))
             
-            logger.info(f"File {file_id} downloaded to {output_path}")
+            logger.info("File %s downloaded to %s", file_id, output_path)
             return True
         
         except HttpError as error:
             logger.error(f"Error downloading file {file_id}: {error}")
             return False
     
-    def _export_google_workspace_file(self, file_id, mime_type, output_path):
+    def iter_file_chunks(self, file_id, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Stream the content of a binary file from Google Drive.
+        
+        Google Workspace files have no binary content and cannot be streamed;
+        use download_file to export them instead.
+        
+        Args:
+            file_id (str): The ID of the file to download.
+            chunk_size (int, optional): Bytes requested per chunk.
+        
+        Yields:
+            bytes: The file content, one chunk at a time.
+        
+        Raises:
+            HttpError: If a chunk cannot be downloaded.
+        """
+        if not self.service:
+            if not self.connect():
+                raise ConnectionError("Not connected to Google Drive")
+        
+        self.download_limiter.acquire()
+        
+        request = self.service.files().get_media(fileId=file_id)
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(buffer, request, chunksize=chunk_size)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk(num_retries=NUM_RETRIES)
+            # Hand each chunk on and reuse the buffer so memory stays at one chunk
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        logger.info("File %s streamed", file_id)
+    
+    def _export_google_workspace_file(self, file_id, mime_type, output_path, chunk_size=DEFAULT_CHUNK_SIZE):
         """
         Export a Google Workspace file to a downloadable format.
         
@@ -187,6 +609,7 @@ class ServiceDriveClient:
             file_id (str): The ID of the file to export.
             mime_type (str): The MIME type of the Google Workspace file.
             output_path (Path): The path where the exported file will be saved.
+            chunk_size (int, optional): Bytes requested per chunk and used as the write buffer size.
             
         Returns:
             bool: True if export is successful, False otherwise.
@@ -222,20 +645,38 @@ class ServiceDriveClient:
             # Export the file
             request = self.service.files().export_media(fileId=file_id, mimeType=export_mime_type)
             
-            with open(new_output_path, 'wb') as f:
-                downloader = MediaIoBaseDownload(f, request)
+            with open(new_output_path, 'wb', buffering=chunk_size) as f:
+                downloader = MediaIoBaseDownload(f, request, chunksize=chunk_size)
+                debug_enabled = logger.isEnabledFor(logging.DEBUG)
                 done = False
                 while not done:
-                    status, done = downloader.next_chunk()
-                    logger.debug(f"Export progress: {int(status.progress() * 100)}%")
+                    status, done = downloader.next_chunk(num_retries=NUM_RETRIES)
+                    if debug_enabled:
+                        logger.debug("Export progress: %d%%", int(status.progress() * 100))
             
-            logger.info(f"Google Workspace file {file_id} exported to {new_output_path}")
+            logger.info("Google Workspace file %s exported to %s", file_id, new_output_path)
             return True
             
         except HttpError as error:
             logger.error(f"Error exporting Google Workspace file {file_id}: {error}")
             return False
     
+    def _preallocate(self, file, size):
+        """
+        Reserve disk space for a download where the platform supports it.
+        
+        Args:
+            file: The open output file.
+            size (int): Number of bytes to reserve.
+        """
+        if not hasattr(os, 'posix_fallocate'):
+            return
+        
+        try:
+            os.posix_fallocate(file.fileno(), 0, size)
+        except OSError as e:
+            logger.debug("Could not preallocate %d bytes: %s", size, e)
+    
     def get_file_metadata(self, file_id):
         """
         Get metadata for a specific file.
@@ -246,16 +687,105 @@ class ServiceDriveClient:
         Returns:
             dict: The file metadata or None if not found.
         """
+        cached = self._get_cached_metadata(file_id, require_parents=True)
+        if cached is not None:
+            return cached
+        
         if not self.service:
             if not self.connect():
                 return None
         
         try:
-            return self.service.files().get(
+            file_metadata = self.service.files().get(
                 fileId=file_id,
-                fields="id, name, mimeType, modifiedTime, size, parents"
-            ).execute()
+                fields=FILE_FIELDS
+            ).execute(num_retries=NUM_RETRIES)
         
         except HttpError as error:
             logger.error(f"Error getting file metadata for {file_id}: {error}")
             return None
+        
+        self._cache_metadata([file_metadata])
+        return file_metadata
+    
+    def get_files_metadata(self, file_ids):
+        """
+        Get metadata for several files, fetching up to 100 per batch HTTP request.
+        
+        Args:
+            file_ids (list): The IDs of the files.
+        
+        Returns:
+            dict: Mapping of file ID to metadata for the files that were found.
+        """
+        if not file_ids:
+            return {}
+        
+        if not self.service:
+            if not self.connect():
+                return {}
+        
+        results = {}
+        
+        def on_result(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Error getting file metadata for {request_id}: {exception}")
+                return
+            results[request_id] = response
+        
+        file_ids = list(dict.fromkeys(file_ids))
+        for start in range(0, len(file_ids), LIST_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_result)
+            for file_id in file_ids[start:start + LIST_BATCH_SIZE]:
+                batch.add(
+                    self.service.files().get(
+                        fileId=file_id,
+                        fields=FILE_FIELDS
+                    ),
+                    request_id=file_id
+                )
+            
+            try:
+                batch.execute()
+            except HttpError as error:
+                logger.error(f"Error getting metadata for {len(file_ids)} files: {error}")
+        
+        self._cache_metadata(list(results.values()))
+        return results
+    
+    def _get_cached_metadata(self, file_id, require_parents=False):
+        """
+        Get unexpired cached metadata for a file.
+        
+        Args:
+            file_id (str): The ID of the file.
+            require_parents (bool, optional): Only accept entries that include parents.
+        
+        Returns:
+            dict: The cached file metadata or None on a miss.
+        """
+        with self._meta_lock:
+            entry = self._meta_cache.get(file_id)
+        
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        if require_parents and 'parents' not in entry[1]:
+            return None
+        return entry[1]
+    
+    def _cache_metadata(self, files):
+        """
+        Cache file metadata for one metadata TTL.
+        
+        Args:
+            files (list): File metadata dictionaries.
+        """
+        expiry = time.monotonic() + self.metadata_ttl
+        with self._meta_lock:
+            for file in files:
+                self._meta_cache.pop(file['id'], None)
+                self._meta_cache[file['id']] = (expiry, file)
+            
+            # Evict the least recently cached entries
+            while len(self._meta_cache) > METADATA_CACHE_SIZE:
+                del self._meta_cache[next(iter(self._meta_cache))]
@@ -0,0 +1,183 @@
+"""
+Web hook receiver for Google Drive change notifications.
+
+This module registers a changes.watch channel and triggers a poll whenever
+Drive reports a change, so changes are picked up without waiting for the
+next polling interval. Polling keeps running as a fallback.
+"""
+
+import hmac
+import time
+import uuid
+import logging
+import threading
+import http.server
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Requested lifetime of a notification channel in seconds; Drive caps
+# changes channels at one week
+CHANNEL_TTL = 24 * 60 * 60
+
+# Channels are renewed this many seconds before they expire
+CHANNEL_RENEW_MARGIN = 10 * 60
+
+
+class WebhookServer:
+    """Receives Drive change notifications and triggers polls."""
+    
+    def __init__(
+        self,
+        drive_client,
+        on_notification: Callable[[], None],
+        address: str,
+        port: int = 8080,
+        token: Optional[str] = None,
+        channel_ttl: int = CHANNEL_TTL
+    ):
+        """
+        Initialize the web hook server.
+        
+        Args:
+            drive_client: The Google Drive client used to register the channel.
+            on_notification: Called, at most one call at a time, after Drive reports changes.
+            address: Public HTTPS URL that forwards to this server.
+            port: Local port to listen on (default: 8080).
+            token: Shared secret Drive echoes back with each notification.
+            channel_ttl: Requested channel lifetime in seconds.
+        """
+        self.drive_client = drive_client
+        self.on_notification = on_notification
+        self.address = address
+        self.port = port
+        self.token = token
+        self.channel_ttl = channel_ttl
+        self.channel: Optional[dict] = None
+        self.running = False
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+        self._renew_timer: Optional[threading.Timer] = None
+        # Set by the request handler; notifications arriving while a poll
+        # runs are coalesced into the next one
+        self._notified = threading.Event()
+    
+    def start(self) -> bool:
+        """
+        Start listening and register the notification channel.
+        
+        Returns:
+            True if started successfully, False otherwise.
+        """
+        if self.running:
+            logger.warning("Web hook server is already running")
+            return False
+        
+        try:
+            self._server = http.server.ThreadingHTTPServer(('0.0.0.0', self.port), self._make_handler())
+        except OSError as e:
+            logger.error(f"Failed to start web hook server on port {self.port}: {e}")
+            return False
+        
+        if not self.token:
+            logger.warning(
+                "google_drive.webhook.token is not set; any request to port %s triggers a poll",
+                self.port
+            )
+        
+        self.running = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._notification_loop, daemon=True).start()
+        
+        self._register_channel()
+        logger.info("Web hook server listening on port %s", self.port)
+        return True
+    
+    def stop(self) -> None:
+        """Stop the notification channel and the server."""
+        if not self.running:
+            return
+        
+        self.running = False
+        if self._renew_timer is not None:
+            self._renew_timer.cancel()
+        
+        if self.channel is not None:
+            self.drive_client.stop_channel(self.channel['id'], self.channel['resourceId'])
+            self.channel = None
+        
+        self._notified.set()
+        self._server.shutdown()
+        self._server.server_close()
+        logger.info("Web hook server stopped")
+    
+    def _register_channel(self) -> None:
+        """Register a new channel, replacing the current one, and schedule its renewal."""
+        if not self.running:
+            return
+        
+        previous = self.channel
+        channel = self.drive_client.watch_changes(
+            str(uuid.uuid4()), self.address, self.token, time.time() + self.channel_ttl
+        )
+        
+        if channel is None:
+            # Polling still covers changes; try again after the margin
+            delay = CHANNEL_RENEW_MARGIN
+        else:
+            self.channel = channel
+            expires_in = int(channel.get('expiration', 0)) / 1000 - time.time()
+            delay = max(expires_in - CHANNEL_RENEW_MARGIN, CHANNEL_RENEW_MARGIN)
+            logger.info("Registered changes notification channel %s", channel['id'])
+            
+            if previous is not None:
+                self.drive_client.stop_channel(previous['id'], previous['resourceId'])
+        
+        self._renew_timer = threading.Timer(delay, self._register_channel)
+        self._renew_timer.daemon = True
+        self._renew_timer.start()
+    
+    def _notification_loop(self) -> None:
+        """Run on_notification for notifications received, one at a time."""
+        while self.running:
+            self._notified.wait()
+            self._notified.clear()
+            if not self.running:
+                break
+            
+            try:
+                self.on_notification()
+            except Exception as e:
+                logger.error(f"Error handling change notification: {e}")
+    
+    def _make_handler(self):
+        """
+        Create the request handler class bound to this server.
+        
+        Returns:
+            The BaseHTTPRequestHandler subclass.
+        """
+        webhook = self
+        
+        class NotificationHandler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                # Compared as bytes; compare_digest rejects non-ASCII str
+                token = self.headers.get('X-Goog-Channel-Token', '').encode('latin-1', 'replace')
+                if webhook.token and not hmac.compare_digest(token, webhook.token.encode()):
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                
+                # Drive sends a 'sync' message when a channel is created
+                state = self.headers.get('X-Goog-Resource-State')
+                logger.debug("Change notification received: %s", state)
+                if state != 'sync':
+                    webhook._notified.set()
+                
+                self.send_response(200)
+                self.end_headers()
+            
+            # Silence log messages
+            def log_message(self, format, *args):
+                return
+        
+        return NotificationHandler
@@ -4,6 +4,7 @@ Error handling and recovery mechanisms for the application.
 """
 
 import time
+import random
 import logging
 import traceback
 from typing import Callable, Dict, Any, Optional, List, Tuple
@@ -16,18 +17,21 @@ class ErrorHandler:
     """Error handling and recovery mechanisms."""
     
     def __init__(self, max_retries: int = 3, retry_delay_seconds: int = 30, 
-                 continue_on_error: bool = True):
+                 continue_on_error: bool = True, max_delay_seconds: int = 300):
         """
         Initialize the error handler.
         
         Args:
             max_retries: Maximum number of retries for failed operations.
-            retry_delay_seconds: Delay between retries in seconds.
+            retry_delay_seconds: Base delay between retries in seconds; doubles on each retry.
             continue_on_error: Whether to continue execution when an error occurs.
+            max_delay_seconds: Upper bound on the backoff delay before jitter.
         """
         self.max_retries = max_retries
         self.retry_delay_seconds = retry_delay_seconds
         self.continue_on_error = continue_on_error
+        self.max_delay_seconds = max_delay_seconds
+        self.rng = random.Random()
         self.error_counts: Dict[str, int] = {}
         self.last_errors: Dict[str, Exception] = {}
     
@@ -51,7 +55,7 @@ class ErrorHandler:
         while retries <= self.max_retries:
             try:
                 if retries > 0:
-                    logger.info(f"Retry {retries}/{self.max_retries} for {op_name}...")
+                    logger.info("Retry %d/%d for %s...", retries, self.max_retries, op_name)
                 
                 result = func(*args, **kwargs)
                 
@@ -68,21 +72,75 @@ class ErrorHandler:
                 
                 if retries < self.max_retries:
                     logger.warning(
-                        f"Error in {op_name} (attempt {retries + 1}/{self.max_retries + 1}): {e}"
+                        "Error in %s (attempt %d/%d): %s",
+                        op_name, retries + 1, self.max_retries + 1, e
                     )
                     # Wait before retrying
-                    time.sleep(self.retry_delay_seconds)
+                    time.sleep(self._retry_delay(retries, e))
                     retries += 1
                 else:
                     logger.error(
-                        f"Operation {op_name} failed after {self.max_retries + 1} attempts: {e}"
+                        "Operation %s failed after %d attempts: %s",
+                        op_name, self.max_retries + 1, e
                     )
-                    logger.debug(f"Error details: {traceback.format_exc()}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Error details: %s", traceback.format_exc())
                     return False, None, e
         
         # This should never be reached
         return False, None, None
     
+    def _retry_delay(self, retries: int, error: Exception) -> float:
+        """
+        Compute how long to wait before the next retry.
+        
+        A Retry-After header on a rate-limited response is honoured as is;
+        otherwise the delay is exponential backoff with random jitter.
+        
+        Args:
+            retries: Number of retries made so far.
+            error: The exception raised by the failed attempt.
+            
+        Returns:
+            Delay in seconds.
+        """
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        
+        delay = min(self.retry_delay_seconds * (2 ** retries), self.max_delay_seconds)
+        return delay + self.rng.uniform(0, self.retry_delay_seconds)
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """
+        Get the Retry-After delay of a rate-limited HTTP error.
+        
+        Handles googleapiclient's HttpError (resp) and requests' HTTPError (response).
+        
+        Args:
+            error: The exception to inspect.
+            
+        Returns:
+            Delay in seconds, or None if the error carries no usable Retry-After header.
+        """
+        resp = getattr(error, 'resp', None)
+        if resp is not None:
+            status, headers = getattr(resp, 'status', None), resp
+        else:
+            response = getattr(error, 'response', None)
+            if response is None:
+                return None
+            status, headers = getattr(response, 'status_code', None), getattr(response, 'headers', {})
+        
+        if status not in (403, 429):
+            return None
+        
+        try:
+            return max(0.0, float(headers.get('retry-after') or headers.get('Retry-After')))
+        except (TypeError, ValueError, AttributeError):
+            return None
+    
     def get_error_stats(self) -> Dict[str, Dict[str, Any]]:
         """
         Get error statistics.
@@ -0,0 +1,277 @@
+"""
+File event handlers for the polling system.
+
+The handlers download new and modified files, upload them to the Dify API
+and remove deleted files, using the components bound in a HandlerContext.
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.file_processor import FileProcessor
+from src.drive.service_drive_client import ServiceDriveClient
+from src.drive.polling_system import PollingSystem
+from src.drive.download_manager import DownloadManager
+from src.dify.file_uploader import FileUploader
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HandlerContext:
+    """Components used by the file event handlers."""
+    download_manager: DownloadManager
+    file_processor: FileProcessor
+    file_uploader: Optional[FileUploader]
+    drive_client: Optional[ServiceDriveClient] = None
+    file_executor: Optional[ThreadPoolExecutor] = None
+    polling_system: Optional[PollingSystem] = None
+    stream_threshold: int = 0
+
+
+def should_stream(ctx: HandlerContext, file: Dict[str, Any]) -> bool:
+    """Check whether a file is large enough to be piped straight to Dify.
+    
+    Args:
+        ctx: Components used by the handlers.
+        file: File metadata dictionary.
+        
+    Returns:
+        bool: True if the file should be streamed instead of downloaded first.
+    """
+    return (
+        ctx.stream_threshold > 0
+        and ctx.file_uploader is not None
+        and int(file.get('size') or 0) >= ctx.stream_threshold
+        and ctx.download_manager.can_stream(file)
+    )
+
+
+def stream_file(ctx: HandlerContext, file: Dict[str, Any]) -> None:
+    """Upload a file to the Dify API while it downloads from Google Drive.
+    
+    Args:
+        ctx: Components used by the handlers.
+        file: File metadata dictionary.
+    """
+    logger.info("Streaming file to Dify API: %s (%s bytes)", file['name'], file.get('size'))
+    success, response = ctx.file_uploader.upload_stream(file, ctx.download_manager.stream_file(file))
+    
+    if success:
+        document_id = response.get('id', 'unknown')
+        logger.info("File streamed successfully to Dify API. Document ID: %s", document_id)
+        ctx.download_manager.mark_uploaded(file)
+    else:
+        error = response.get('error', 'unknown error')
+        logger.error("Failed to stream file to Dify API: %s", error)
+
+
+# File event handlers
+def _sync_file(ctx: HandlerContext, file: Dict[str, Any], kind: str) -> None:
+    """Download a new or modified file and upload it to the Dify API.
+    
+    Args:
+        ctx: Components used by the handlers.
+        file: File metadata dictionary.
+        kind: 'new' or 'modified'; only changes the log wording.
+    """
+    # "file" for new files, "modified file" for modified ones
+    label = 'file' if kind == 'new' else f"{kind} file"
+    logger.info("%s file detected: %s (%s)", kind.capitalize(), file['name'], file['id'])
+    
+    # Skip files whose current content has already been uploaded
+    if ctx.download_manager.is_in_sync(file):
+        logger.info("File already uploaded, skipping: %s (%s)", file['name'], file['id'])
+        return
+    
+    # Large files skip the disk and are piped from Drive to Dify
+    if should_stream(ctx, file):
+        stream_file(ctx, file)
+        return
+    
+    # Download the file
+    download_path = ctx.download_manager.download_file(file)
+    
+    if download_path:
+        # Process the file
+        file_info = ctx.file_processor.get_file_info(download_path)
+        logger.info("Downloaded %s: %s (%s bytes)", label, file_info['name'], file_info['size'])
+        
+        try:
+            # Upload to Dify API if available
+            if ctx.file_uploader:
+                logger.info("Uploading %s to Dify API: %s", label, file['name'])
+                success, response = ctx.file_uploader.upload_file(file, download_path)
+                
+                if success:
+                    document_id = response.get('id', 'unknown')
+                    logger.info("%s uploaded successfully to Dify API. Document ID: %s", label.capitalize(), document_id)
+                    
+                    ctx.download_manager.mark_uploaded(file)
+                    
+                    # Delete the file after successful upload
+                    try:
+                        os.unlink(download_path)
+                        logger.info("Deleted downloaded file after successful upload: %s", download_path)
+                    except FileNotFoundError:
+                        pass
+                    # Remove from tracking dictionary
+                    ctx.download_manager.remove_tracking(file['id'])
+                else:
+                    error = response.get('error', 'unknown error')
+                    logger.error("Failed to upload %s to Dify API: %s", label, error)
+            else:
+                logger.warning("Dify API integration is disabled. Skipping upload.")
+        except Exception as e:
+            logger.exception("Error during file processing or upload: %s", e)
+    else:
+        logger.error("Failed to download %s: %s (%s)", label, file['name'], file['id'])
+
+
+def file_tasks(
+    new_files: List[Dict[str, Any]],
+    modified_files: List[Dict[str, Any]]
+) -> List[Tuple[Dict[str, Any], str]]:
+    """Pair the new and modified files of a poll with their kind.
+    
+    The list belongs to a single poll, so polls running at the same time
+    never process each other's files.
+    
+    Args:
+        new_files: List of new file metadata.
+        modified_files: List of modified file metadata.
+        
+    Returns:
+        List[Tuple[Dict[str, Any], str]]: (file, kind) pairs.
+    """
+    tasks = [(file, 'new') for file in new_files]
+    tasks.extend((file, 'modified') for file in modified_files)
+    return tasks
+
+
+def run_file_tasks(ctx: HandlerContext, tasks: List[Tuple[Dict[str, Any], str]]) -> None:
+    """Prefetch metadata for the files of a poll, then process them concurrently.
+    
+    Args:
+        ctx: Components used by the handlers.
+        tasks: (file, kind) pairs from file_tasks.
+    """
+    if not tasks:
+        return
+    
+    # Listings already carry the full metadata; fetch what is missing with
+    # one batched request per 100 files instead of one per download
+    missing = [file for file, _ in tasks if 'parents' not in file]
+    if ctx.drive_client is not None and missing:
+        metadata = ctx.drive_client.get_files_metadata([file['id'] for file in missing])
+        for file in missing:
+            file.update(metadata.get(file['id'], {}))
+    
+    if ctx.file_executor is None:
+        for file, kind in tasks:
+            _sync_file(ctx, file, kind)
+        return
+    
+    futures = [ctx.file_executor.submit(_sync_file, ctx, file, kind) for file, kind in tasks]
+    for completed, future in enumerate(as_completed(futures), 1):
+        if future.exception() is not None:
+            logger.error("Error processing file: %s", future.exception())
+        logger.debug("Processed %d of %d files", completed, len(futures))
+
+
+def handle_deleted_files(ctx: HandlerContext, files: List[Dict[str, Any]]) -> None:
+    """Handle the deleted file events of a poll.
+    
+    Local copies are removed one by one, then the Dify documents are
+    deleted concurrently with one call.
+    
+    Args:
+        ctx: Components used by the handlers.
+        files: File metadata dictionaries.
+    """
+    for file in files:
+        logger.info("Deleted file detected: %s", file['id'])
+        
+        # Check if we have a local copy
+        local_path = ctx.download_manager.get_downloaded_file(file['id'])
+        if local_path:
+            try:
+                os.unlink(local_path)
+                logger.info("Removed local copy of deleted file: %s", local_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error("Error removing local file %s: %s", local_path, e)
+            # Remove from tracking dictionary
+            ctx.download_manager.remove_tracking(file['id'])
+    
+    # A restored file must be uploaded again
+    ctx.download_manager.forget_uploads([file['id'] for file in files])
+    
+    # Delete from Dify API if available
+    if ctx.file_uploader:
+        logger.info("Deleting %d files from Dify API", len(files))
+        results = ctx.file_uploader.delete_documents([file['id'] for file in files])
+        
+        for file_id, result in results.items():
+            if result['success']:
+                logger.info("File deleted successfully from Dify API: %s", file_id)
+            else:
+                error = result['response'].get('error', 'unknown error')
+                logger.error("Failed to delete file %s from Dify API: %s", file_id, error)
+    else:
+        logger.warning("Dify API integration is disabled. Skipping deletion.")
+
+
+def handle_poll_complete(
+    ctx: HandlerContext,
+    new_files: List[Dict[str, Any]],
+    modified_files: List[Dict[str, Any]],
+    deleted_files: List[Dict[str, Any]]
+) -> None:
+    """Handle poll completion event.
+    
+    Args:
+        ctx: Components used by the handlers.
+        new_files: List of new file metadata.
+        modified_files: List of modified file metadata.
+        deleted_files: List of deleted file metadata.
+    """
+    # Process the new and modified files of this poll
+    run_file_tasks(ctx, file_tasks(new_files, modified_files))
+    
+    # Back off while the folder is idle and return to the base interval on changes
+    if ctx.polling_system is not None:
+        if new_files or modified_files or deleted_files:
+            ctx.polling_system.set_next_interval(ctx.polling_system.interval)
+        else:
+            ctx.polling_system.set_next_interval(ctx.polling_system.next_interval * 2)
+    
+    logger.info(
+        "Poll complete: %d new, %d modified, %d deleted",
+        len(new_files), len(modified_files), len(deleted_files)
+    )
+
+
+def make_handlers(ctx: HandlerContext) -> Dict[str, Callable[..., None]]:
+    """Create the polling system callbacks bound to the given components.
+    
+    Args:
+        ctx: Components used by the handlers.
+        
+    Returns:
+        Dict[str, Callable[..., None]]: Callbacks keyed by event type.
+    """
+    def on_deleted_files(files: List[Dict[str, Any]]) -> None:
+        handle_deleted_files(ctx, files)
+    
+    def on_poll_complete(new_files, modified_files, deleted_files) -> None:
+        handle_poll_complete(ctx, new_files, modified_files, deleted_files)
+    
+    return {
+        'deleted_files_bulk': on_deleted_files,
+        'poll_complete': on_poll_complete,
+    }
@@ -5,17 +5,15 @@ This application monitors a Google Drive folder (and its subfolders) for new or
 modified files and pushes them to the Dify API.
 """
 
-import os
 import sys
-import time
 import signal
 import logging
+import threading
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, List, Dict, Any, Optional
-
-# Add the parent directory to sys.path
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from types import SimpleNamespace
+from typing import Tuple, Dict, Optional, Callable
 
 from src.utils.config import Config
 from src.utils.logger import setup_logger
@@ -25,14 +23,45 @@ from src.database.db_manager import DatabaseManager
 from src.drive.change_detector import ChangeDetector
 from src.drive.polling_system import PollingSystem
 from src.drive.download_manager import DownloadManager
+from src.drive.webhook_server import WebhookServer
 from src.dify.dify_client import DifyClient
 from src.dify.file_uploader import FileUploader
 from src.scheduler import Scheduler
 from src.error_handler import ErrorHandler
+from src.handlers import HandlerContext, make_handlers
 
 # Configure module logger
 logger = logging.getLogger(__name__)
 
+# Accepted --log-level names and their numeric levels
+LOG_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+}
+
+
+def parse_log_level(name: str) -> int:
+    """Convert a --log-level argument to its numeric logging level.
+    
+    Args:
+        name: Level name, case-insensitive.
+        
+    Returns:
+        int: The logging level.
+        
+    Raises:
+        argparse.ArgumentTypeError: If the name is not a known level.
+    """
+    try:
+        return LOG_LEVELS[name.upper()]
+    except KeyError:
+        raise argparse.ArgumentTypeError(
+            f"invalid level '{name}' (choose from {', '.join(LOG_LEVELS)})"
+        )
+
 
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments.
@@ -45,15 +74,15 @@ def parse_arguments() -> argparse.Namespace:
     )
     parser.add_argument(
         '--config',
-        type=str,
+        type=Path,
         default='config/config.yaml',
         help='Path to the configuration file'
     )
     parser.add_argument(
         '--log-level',
-        type=str,
-        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
-        default='INFO',
+        type=parse_log_level,
+        default=logging.INFO,
+        metavar='{' + ','.join(LOG_LEVELS) + '}',
         help='Set the logging level'
     )
     parser.add_argument(
@@ -71,150 +100,48 @@ def parse_arguments() -> argparse.Namespace:
         action='store_true',
         help='Run the sync process once and exit (same as --poll-now)'
     )
-    return parser.parse_args()
-
-
-# File event handlers
-def handle_new_file(file: Dict[str, Any]) -> None:
-    """Handle a new file event.
-    
-    Args:
-        file: File metadata dictionary.
-    """
-    logger.info(f"New file detected: {file['name']} ({file['id']})")
+    args = parser.parse_args()
     
-    # Download the file
-    download_path = download_manager.download_file(file)
-    
-    if download_path:
-        # Process the file
-        file_info = file_processor.get_file_info(download_path)
-        logger.info(f"Downloaded file: {file_info['name']} ({file_info['size']} bytes)")
-        
-        try:
-            # Upload to Dify API if available
-            if file_uploader:
-                logger.info(f"Uploading file to Dify API: {file['name']}")
-                success, response = file_uploader.upload_file(file, download_path)
-                
-                if success:
-                    document_id = response.get('id', 'unknown')
-                    logger.info(f"File uploaded successfully to Dify API. Document ID: {document_id}")
-                    
-                    # Delete the file after successful upload
-                    if download_path.exists():
-                        download_path.unlink()
-                        # Remove from tracking dictionary
-                        download_manager.remove_tracking(file['id'])
-                        logger.info(f"Deleted downloaded file after successful upload: {download_path}")
-                else:
-                    error = response.get('error', 'unknown error')
-                    logger.error(f"Failed to upload file to Dify API: {error}")
-            else:
-                logger.warning("Dify API integration is disabled. Skipping upload.")
-        except Exception as e:
-            logger.exception(f"Error during file processing or upload: {e}")
-    else:
-        logger.error(f"Failed to download file: {file['name']} ({file['id']})")
-
+    # Resolve the configuration path once so later messages show it in full
+    args.config = args.config.expanduser().resolve()
+    return args
 
 
-def handle_modified_file(file: Dict[str, Any]) -> None:
-    """Handle a modified file event.
+def load_settings(config: Config) -> SimpleNamespace:
+    """Read the configuration values used at startup in a single pass.
     
     Args:
-        file: File metadata dictionary.
-    """
-    logger.info(f"Modified file detected: {file['name']} ({file['id']})")
-    
-    # Download the file
-    download_path = download_manager.download_file(file)
-    
-    if download_path:
-        # Process the file
-        file_info = file_processor.get_file_info(download_path)
-        logger.info(f"Downloaded modified file: {file_info['name']} ({file_info['size']} bytes)")
+        config: Application configuration.
         
-        try:
-            # Upload to Dify API if available
-            if file_uploader:
-                logger.info(f"Uploading modified file to Dify API: {file['name']}")
-                success, response = file_uploader.upload_file(file, download_path)
-                
-                if success:
-                    document_id = response.get('id', 'unknown')
-                    logger.info(f"Modified file uploaded successfully to Dify API. Document ID: {document_id}")
-                    
-                    # Delete the file after successful upload
-                    if download_path.exists():
-                        download_path.unlink()
-                        # Remove from tracking dictionary
-                        download_manager.remove_tracking(file['id'])
-                        logger.info(f"Deleted downloaded file after successful upload: {download_path}")
-                else:
-                    error = response.get('error', 'unknown error')
-                    logger.error(f"Failed to upload modified file to Dify API: {error}")
-            else:
-                logger.warning("Dify API integration is disabled. Skipping upload.")
-        except Exception as e:
-            logger.exception(f"Error during file processing or upload: {e}")
-    else:
-        logger.error(f"Failed to download modified file: {file['name']} ({file['id']})")
-
-
-
-def handle_deleted_file(file: Dict[str, Any]) -> None:
-    """Handle a deleted file event.
-    
-    Args:
-        file: File metadata dictionary.
-    """
-    logger.info(f"Deleted file detected: {file['id']}")
-    
-    # Check if we have a local copy
-    local_path = download_manager.get_downloaded_file(file['id'])
-    if local_path and local_path.exists():
-        logger.info(f"Removing local copy of deleted file: {local_path}")
-        try:
-            local_path.unlink()
-            # Remove from tracking dictionary
-            download_manager.remove_tracking(file['id'])
-        except Exception as e:
-            logger.error(f"Error removing local file {local_path}: {e}")
-    
-    # Delete from Dify API if available
-    if file_uploader:
-        logger.info(f"Deleting file from Dify API: {file['id']}")
-        success, response = file_uploader.delete_document(file['id'])
-        
-        if success:
-            logger.info(f"File deleted successfully from Dify API")
-        else:
-            error = response.get('error', 'unknown error')
-            logger.error(f"Failed to delete file from Dify API: {error}")
-    else:
-        logger.warning("Dify API integration is disabled. Skipping deletion.")
-
-
-def handle_poll_complete(
-    new_files: List[Dict[str, Any]],
-    modified_files: List[Dict[str, Any]],
-    deleted_files: List[Dict[str, Any]]
-) -> None:
-    """Handle poll completion event.
-    
-    Args:
-        new_files: List of new file metadata.
-        modified_files: List of modified file metadata.
-        deleted_files: List of deleted file metadata.
+    Returns:
+        SimpleNamespace: The settings as plain attributes.
     """
-    logger.info(
-        f"Poll complete: {len(new_files)} new, {len(modified_files)} modified, "
-        f"{len(deleted_files)} deleted"
+    polling_interval = config.get('google_drive.polling_interval', 300)
+    cleanup_interval = config.get('downloads.cleanup_interval', 3600)  # Default: 1 hour
+    
+    return SimpleNamespace(
+        db_path=config.get('database.path', 'data/file_metadata.db'),
+        download_dir=config.get('downloads.path', 'data/downloads'),
+        max_concurrent_downloads=config.get('downloads.max_concurrent_downloads', 4),
+        parallel_workers=config.get('sync.parallel_workers', 8),
+        stream_threshold_mb=config.get('sync.stream_threshold_mb', 50),
+        polling_interval=polling_interval,
+        max_polling_interval=config.get('google_drive.max_interval', polling_interval),
+        cleanup_interval=cleanup_interval,
+        scheduler_enabled=config.get('scheduler.enabled', True),
+        scheduler_polling_interval=config.get('scheduler.polling_interval', polling_interval),
+        scheduler_cleanup_interval=config.get('scheduler.cleanup_interval', cleanup_interval),
+        max_retries=config.get('scheduler.error_recovery.max_retries', 3),
+        retry_delay=config.get('scheduler.error_recovery.retry_delay_seconds', 30),
+        continue_on_error=config.get('scheduler.error_recovery.continue_on_error', True),
+        webhook_enabled=config.get('google_drive.webhook.enabled', False),
+        webhook_address=config.get('google_drive.webhook.address'),
+        webhook_port=config.get('google_drive.webhook.port', 8080),
+        webhook_token=config.get('google_drive.webhook.token'),
     )
 
 
-def setup_components(config_path: Path) -> Tuple[Config, DatabaseManager, ServiceDriveClient, ChangeDetector, PollingSystem, DownloadManager, FileProcessor, DifyClient, FileUploader, Scheduler, ErrorHandler]:
+def setup_components(config_path: Path) -> Tuple[SimpleNamespace, DatabaseManager, ServiceDriveClient, ChangeDetector, PollingSystem, DownloadManager, FileProcessor, DifyClient, FileUploader, Scheduler, ErrorHandler]:
     """Set up application components.
     
     Args:
@@ -222,7 +149,7 @@ def setup_components(config_path: Path) -> Tuple[Config, DatabaseManager, Servic
         
     Returns:
         Tuple containing the initialized components:
-        - Config: Application configuration.
+        - SimpleNamespace: Application settings (see load_settings).
         - DatabaseManager: Database manager for file metadata.
         - ServiceDriveClient: Google Drive client.
         - ChangeDetector: File change detector.
@@ -240,23 +167,34 @@ def setup_components(config_path: Path) -> Tuple[Config, DatabaseManager, Servic
         ValueError: If Dify API configuration is invalid.
     """
     # Load configuration
-    if not config_path.exists():
+    if not config_path.is_file():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
     config = Config(config_path)
-    logger.info(f"Configuration loaded from {config_path}")
+    logger.info("Configuration loaded from %s", config_path)
+    settings = load_settings(config)
+    
+    db_manager = DatabaseManager(settings.db_path)
+    drive_client = ServiceDriveClient(config)
+    
+    # The database, Google Drive connection, file processor and download
+    # manager are independent, so initialize them concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        db_future = executor.submit(db_manager.initialize_db)
+        drive_future = executor.submit(drive_client.connect)
+        file_processor_future = executor.submit(FileProcessor)
+        download_manager_future = executor.submit(
+            DownloadManager, drive_client, settings.download_dir, settings.max_concurrent_downloads
+        )
     
     # Initialize database
-    db_path = config.get('database.path', 'data/file_metadata.db')
-    db_manager = DatabaseManager(db_path)
-    if not db_manager.initialize_db():
+    if not db_future.result():
         raise RuntimeError("Failed to initialize database")
     
-    logger.info(f"Database initialized at {db_path}")
+    logger.info("Database initialized at %s", settings.db_path)
     
     # Initialize Google Drive client
-    drive_client = ServiceDriveClient(config)
-    if not drive_client.connect():
+    if not drive_future.result():
         raise RuntimeError("Failed to connect to Google Drive API")
     
     logger.info("Connected to Google Drive API successfully")
@@ -265,24 +203,22 @@ def setup_components(config_path: Path) -> Tuple[Config, DatabaseManager, Servic
     change_detector = ChangeDetector(drive_client, db_manager)
     
     # Initialize polling system
-    polling_interval = config.get('google_drive.polling_interval', 300)
-    polling_system = PollingSystem(change_detector, polling_interval)
+    polling_system = PollingSystem(change_detector, settings.polling_interval, settings.max_polling_interval)
     
     # Initialize file processor
-    file_processor = FileProcessor()
+    file_processor = file_processor_future.result()
     logger.info("File processor initialized")
     
     # Initialize download manager
-    download_dir = config.get('downloads.path', 'data/downloads')
-    download_manager = DownloadManager(drive_client, download_dir)
-    logger.info(f"Download manager initialized with directory: {download_dir}")
+    download_manager = download_manager_future.result()
+    logger.info("Download manager initialized with directory: %s", settings.download_dir)
     
     # Initialize Dify client
     try:
         dify_client = DifyClient(config)
         logger.info("Dify API client initialized")
     except ValueError as e:
-        logger.error(f"Failed to initialize Dify API client: {e}")
+        logger.error("Failed to initialize Dify API client: %s", e)
         logger.warning("Dify API integration will be disabled")
         dify_client = None
     
@@ -299,33 +235,90 @@ def setup_components(config_path: Path) -> Tuple[Config, DatabaseManager, Servic
     logger.info("Task scheduler initialized")
     
     # Initialize error handler
-    max_retries = config.get('scheduler.error_recovery.max_retries', 3)
-    retry_delay = config.get('scheduler.error_recovery.retry_delay_seconds', 30)
-    continue_on_error = config.get('scheduler.error_recovery.continue_on_error', True)
-    error_handler = ErrorHandler(max_retries, retry_delay, continue_on_error)
-    logger.info(f"Error handler initialized with max_retries={max_retries}, retry_delay={retry_delay}s")
+    error_handler = ErrorHandler(settings.max_retries, settings.retry_delay, settings.continue_on_error)
+    logger.info("Error handler initialized with max_retries=%s, retry_delay=%ss", settings.max_retries, settings.retry_delay)
+    
+    return settings, db_manager, drive_client, change_detector, polling_system, download_manager, file_processor, dify_client, file_uploader, scheduler, error_handler
+
+
+def start_webhook_server(
+    settings: SimpleNamespace,
+    drive_client: ServiceDriveClient,
+    on_notification: Callable[[], None]
+) -> Optional[WebhookServer]:
+    """Start receiving Drive change notifications if enabled in the configuration.
     
-    return config, db_manager, drive_client, change_detector, polling_system, download_manager, file_processor, dify_client, file_uploader, scheduler, error_handler
+    Args:
+        settings: Application settings.
+        drive_client: The Google Drive client used to register the channel.
+        on_notification: Called to poll when Drive reports changes.
+        
+    Returns:
+        Optional[WebhookServer]: The running server, or None if disabled or it failed to start.
+    """
+    if not settings.webhook_enabled:
+        return None
+    
+    if not settings.webhook_address:
+        logger.error("google_drive.webhook.address is required for change notifications")
+        return None
+    
+    server = WebhookServer(
+        drive_client,
+        on_notification,
+        settings.webhook_address,
+        settings.webhook_port,
+        settings.webhook_token
+    )
+    if not server.start():
+        return None
+    
+    logger.info("Change notifications enabled; polling continues as a fallback")
+    return server
 
 
-def register_event_handlers(polling_system: PollingSystem) -> None:
+def register_event_handlers(polling_system: PollingSystem, handlers: Dict[str, Callable[..., None]]) -> None:
     """Register event handlers for the polling system.
     
     Args:
         polling_system: The polling system to register handlers with.
+        handlers: Callbacks keyed by event type (see make_handlers).
     """
-    polling_system.register_callback('new_file', handle_new_file)
-    polling_system.register_callback('modified_file', handle_modified_file)
-    polling_system.register_callback('deleted_file', handle_deleted_file)
-    polling_system.register_callback('poll_complete', handle_poll_complete)
+    for event_type, callback in handlers.items():
+        polling_system.register_callback(event_type, callback)
 
 
-def setup_signal_handlers(polling_system: PollingSystem, db_manager: DatabaseManager) -> None:
+def close_file_pipeline(db_manager: DatabaseManager, cancel_pending: bool = False) -> None:
+    """Finish file transfers, persist their upload statuses and close the database.
+    
+    The order matters: running uploads keep queueing statuses until the file
+    executor has shut down, and the flush needs the database still open.
+    
+    Args:
+        db_manager: The database manager to close.
+        cancel_pending: Whether to drop queued file tasks instead of running them.
+    """
+    # Let in-flight file transfers finish
+    if file_executor is not None:
+        file_executor.shutdown(wait=True, cancel_futures=cancel_pending)
+    
+    # Persist pending upload statuses before the database closes
+    if file_uploader is not None:
+        file_uploader.flush()
+    
+    # Close the database connection
+    if db_manager:
+        db_manager.close()
+        logger.info("Database connection closed")
+
+
+def setup_signal_handlers(polling_system: PollingSystem, db_manager: DatabaseManager, download_manager: DownloadManager) -> None:
     """Set up signal handlers for graceful shutdown.
     
     Args:
         polling_system: The polling system to stop on shutdown.
         db_manager: The database manager to close on shutdown.
+        download_manager: The download manager whose files are removed on shutdown.
     """
     def signal_handler(sig, frame):
         logger.info("Shutting down...")
@@ -335,15 +328,26 @@ def setup_signal_handlers(polling_system: PollingSystem, db_manager: DatabaseMan
             polling_system.stop()
             logger.info("Polling system stopped")
         
+        # Stop receiving change notifications
+        if webhook_server is not None:
+            webhook_server.stop()
+        
         # Stop the scheduler if it's running
         if scheduler is not None:
             scheduler.stop()
             logger.info("Scheduler stopped")
         
-        # Close the database connection
-        if db_manager:
-            db_manager.close()
-            logger.info("Database connection closed")
+        # Let in-flight file transfers finish, drop queued ones, then
+        # persist their statuses and close the database
+        close_file_pipeline(db_manager, cancel_pending=True)
+        
+        # Close pooled Dify API connections
+        if dify_client is not None:
+            dify_client.close()
+        
+        # Shut down the Drive worker pools
+        if drive_client is not None:
+            drive_client.close()
         
         # Clean up downloaded files
         if download_manager is not None:
@@ -357,47 +361,64 @@ def setup_signal_handlers(polling_system: PollingSystem, db_manager: DatabaseMan
             if error_stats:
                 logger.info("Error statistics during this run:")
                 for op_name, stats in error_stats.items():
-                    logger.info(f"  {op_name}: {stats['count']} errors, last error: {stats['last_error']}")
+                    logger.info("  %s: %s errors, last error: %s", op_name, stats['count'], stats['last_error'])
             else:
                 logger.info("No errors occurred during this run")
                 
         logger.info("Shutdown complete")
-        sys.exit(0)
+        shutdown_event.set()
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
 
 # Global variables for file handling components
-download_manager: Optional[DownloadManager] = None
-file_processor: Optional[FileProcessor] = None
+drive_client: Optional[ServiceDriveClient] = None
 file_uploader: Optional[FileUploader] = None
 dify_client: Optional[DifyClient] = None
 scheduler: Optional[Scheduler] = None
 error_handler: Optional[ErrorHandler] = None
+webhook_server: Optional[WebhookServer] = None
+
+# Worker pool downloading and uploading the files of a poll concurrently
+file_executor: Optional[ThreadPoolExecutor] = None
+
+# Set by the signal handler once shutdown is complete
+shutdown_event = threading.Event()
 
 
 def main() -> None:
     """Main entry point for the application."""
-    global download_manager, file_processor, file_uploader, dify_client, scheduler, error_handler
+    global drive_client, file_uploader, dify_client, scheduler, error_handler
+    global file_executor, webhook_server
     
     args = parse_arguments()
     
     # Setup logging
     logger = setup_logger(args.log_level)
-    logger.info(f"Starting Google Drive Sync with log level: {args.log_level}")
+    logger.info("Starting Google Drive Sync with log level: %s", logging.getLevelName(args.log_level))
     
     try:
         # Set up components
-        config_path = Path(args.config)
-        if not config_path.exists():
-            logger.error(f"Configuration file not found: {config_path}")
-            sys.exit(1)
-            
-        config, db_manager, drive_client, change_detector, polling_system, download_manager, file_processor, dify_client, file_uploader, scheduler, error_handler = setup_components(config_path)
+        settings, db_manager, drive_client, change_detector, polling_system, download_manager, file_processor, dify_client, file_uploader, scheduler, error_handler = setup_components(args.config)
+        
+        # Process the files of each poll concurrently
+        file_executor = ThreadPoolExecutor(
+            max_workers=settings.parallel_workers,
+            thread_name_prefix='file-sync'
+        )
         
         # Register event handlers
-        register_event_handlers(polling_system)
+        handler_context = HandlerContext(
+            download_manager=download_manager,
+            file_processor=file_processor,
+            file_uploader=file_uploader,
+            drive_client=drive_client,
+            file_executor=file_executor,
+            polling_system=polling_system,
+            stream_threshold=int(settings.stream_threshold_mb * 1024 * 1024)
+        )
+        register_event_handlers(polling_system, make_handlers(handler_context))
         
         # Handle run-once mode (same as poll-now)
         if args.poll_now or args.run_once:
@@ -405,52 +426,55 @@ def main() -> None:
             logger.info("Polling for changes...")
             new_files, modified_files, deleted_files = polling_system.poll_now()
             logger.info(
-                f"Poll complete: {len(new_files)} new, {len(modified_files)} modified, "
-                f"{len(deleted_files)} deleted"
+                "Poll complete: %d new, %d modified, %d deleted",
+                len(new_files), len(modified_files), len(deleted_files)
             )
             
             # Clean up old downloaded files
             download_manager.cleanup_old_files()
+            
+            # Wait for the poll's file transfers and persist their statuses
+            close_file_pipeline(db_manager)
             return
         
         # Set up signal handlers
-        setup_signal_handlers(polling_system, db_manager)
-        
-        # Get configuration values
-        polling_interval = config.get('google_drive.polling_interval', 300)
-        cleanup_interval = config.get('downloads.cleanup_interval', 3600)  # Default: 1 hour
-        
-        # Get scheduler settings
-        scheduler_enabled = config.get('scheduler.enabled', True)
-        scheduler_polling_interval = config.get('scheduler.polling_interval', polling_interval)
-        scheduler_cleanup_interval = config.get('scheduler.cleanup_interval', cleanup_interval)
+        setup_signal_handlers(polling_system, db_manager, download_manager)
         
         # Use the scheduler or legacy polling system based on user preference and config
-        if args.no_scheduler or not scheduler_enabled:
+        if args.no_scheduler or not settings.scheduler_enabled:
             # Legacy polling system
             logger.info("Using legacy polling system (scheduler disabled)")
             polling_system.start()
-            logger.info(f"Polling system started with interval of {polling_interval} seconds")
+            logger.info("Polling system started with interval of %s seconds", settings.polling_interval)
+            
+            # Clean up old files on a self-rescheduling timer
+            def schedule_cleanup():
+                if shutdown_event.is_set():
+                    return
+                timer = threading.Timer(settings.cleanup_interval, run_cleanup)
+                timer.daemon = True
+                timer.start()
+            
+            def run_cleanup():
+                try:
+                    download_manager.cleanup_old_files()
+                finally:
+                    schedule_cleanup()
+            
+            schedule_cleanup()
+            
+            # Poll as soon as Drive reports changes
+            webhook_server = start_webhook_server(settings, drive_client, polling_system.request_poll)
             
             logger.info("Application started successfully. Press Ctrl+C to exit.")
             
-            # Keep the main thread alive
+            # Keep the main thread alive until shutdown
             try:
-                last_cleanup = time.time()
-                
-                while True:
-                    current_time = time.time()
-                    
-                    # Clean up old files if needed
-                    if current_time - last_cleanup > cleanup_interval:
-                        download_manager.cleanup_old_files()
-                        last_cleanup = current_time
-                    
-                    time.sleep(1)
+                shutdown_event.wait()
             except KeyboardInterrupt:
                 logger.info("Keyboard interrupt received. Shutting down...")
                 polling_system.stop()
-                db_manager.close()
+                close_file_pipeline(db_manager, cancel_pending=True)
         else:
             # Use the scheduler
             logger.info("Using task scheduler for orchestration")
@@ -467,14 +491,21 @@ def main() -> None:
                     try:
                         new_files, modified_files, deleted_files = result
                         logger.info(
-                            f"Poll complete: {len(new_files)} new, {len(modified_files)} modified, "
-                            f"{len(deleted_files)} deleted"
+                            "Poll complete: %d new, %d modified, %d deleted",
+                            len(new_files), len(modified_files), len(deleted_files)
                         )
+                        
+                        # Follow the polling system's backoff while the folder is idle
+                        poll_interval = max(settings.scheduler_polling_interval, polling_system.next_interval)
+                        # The task is gone if the scheduler stopped during the poll
+                        poll_status = scheduler.get_task_status('poll')
+                        if poll_status and poll_interval != poll_status['interval']:
+                            scheduler.update_task_interval('poll', poll_interval)
                     except (TypeError, ValueError) as e:
-                        logger.error(f"Error processing polling results: {e}")
-                        logger.debug(f"Received result: {result}")
+                        logger.error("Error processing polling results: %s", e)
+                        logger.debug("Received result: %s", result)
                 else:
-                    logger.error(f"Polling failed: {exc}")
+                    logger.error("Polling failed: %s", exc)
             
             # Define the cleanup function
             def cleanup_downloads():
@@ -486,32 +517,34 @@ def main() -> None:
                 
                 if success:
                     num_deleted = result
-                    logger.info(f"Cleaned up {num_deleted} old files")
+                    logger.info("Cleaned up %s old files", num_deleted)
                 else:
-                    logger.error(f"Cleanup failed: {exc}")
+                    logger.error("Cleanup failed: %s", exc)
             
             # Add tasks to the scheduler
-            scheduler.add_task('poll', poll_for_changes, scheduler_polling_interval)
-            scheduler.add_task('cleanup', cleanup_downloads, scheduler_cleanup_interval)
+            scheduler.add_task('poll', poll_for_changes, settings.scheduler_polling_interval)
+            scheduler.add_task('cleanup', cleanup_downloads, settings.scheduler_cleanup_interval)
             
             # Start the scheduler
             scheduler.start()
-            logger.info(f"Scheduler started with polling interval of {scheduler_polling_interval} seconds")
-            logger.info(f"File cleanup scheduled every {scheduler_cleanup_interval} seconds")
+            logger.info("Scheduler started with polling interval of %s seconds", settings.scheduler_polling_interval)
+            logger.info("File cleanup scheduled every %s seconds", settings.scheduler_cleanup_interval)
             
-            logger.info("Application started successfully. Press Ctrl+C to exit.")
+            # Poll as soon as Drive reports changes
+            webhook_server = start_webhook_server(
+                settings, drive_client, lambda: scheduler.run_task_now('poll')
+            )
             
-            # Run initial poll
-            poll_for_changes()
+            # The scheduler runs the first poll as soon as it starts
+            logger.info("Application started successfully. Press Ctrl+C to exit.")
             
-            # Keep the main thread alive
+            # Keep the main thread alive until shutdown
             try:
-                while True:
-                    time.sleep(1)
+                shutdown_event.wait()
             except KeyboardInterrupt:
                 logger.info("Keyboard interrupt received. Shutting down...")
                 scheduler.stop()
-                db_manager.close()
+                close_file_pipeline(db_manager, cancel_pending=True)
         
     except FileNotFoundError as e:
         logger.error(str(e))
@@ -520,7 +553,7 @@ def main() -> None:
         logger.error(str(e))
         sys.exit(1)
     except Exception as e:
-        logger.exception(f"Application failed: {e}")
+        logger.exception("Application failed: %s", e)
         sys.exit(1)
 
 
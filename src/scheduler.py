@@ -4,11 +4,12 @@ Scheduler for running the sync process at regular intervals.
 """
 
 import time
+import heapq
 import signal
 import logging
 import threading
-from typing import Callable, Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, Optional, List, Tuple
+from datetime import datetime
 
 # Configure module logger
 logger = logging.getLogger(__name__)
@@ -22,8 +23,20 @@ class Scheduler:
         self.tasks: Dict[str, Dict[str, Any]] = {}
         self.running = False
         self.thread: Optional[threading.Thread] = None
+        # Never held while a task runs, and no method re-acquires it
         self.lock = threading.Lock()
-        self.last_run_times: Dict[str, datetime] = {}
+        # Wall-clock completion times as time.time() values; converted to
+        # datetimes only when a status is requested
+        self.last_run_times: Dict[str, float] = {}
+        # (next_run, task_id) pairs ordered by next run on the monotonic
+        # clock. Entries of removed or rescheduled tasks are left in place
+        # and skipped when they reach the top.
+        self._heap: List[Tuple[float, str]] = []
+        # Set to wake the scheduler thread when the earliest deadline changes
+        self._wake = threading.Event()
+        # Monotonic next-run times are reported as wall-clock times against these anchors
+        self._wall_anchor = time.time()
+        self._monotonic_anchor = time.monotonic()
     
     def add_task(self, task_id: str, func: Callable, interval_seconds: int, 
                  args: Optional[List] = None, kwargs: Optional[Dict] = None) -> None:
@@ -44,9 +57,12 @@ class Scheduler:
                 'args': args or [],
                 'kwargs': kwargs or {},
                 'last_run': None,
-                'next_run': datetime.now()
+                'next_run': None,
+                # Serializes runs of this task, which happen outside self.lock
+                'run_lock': threading.Lock()
             }
-            logger.info(f"Task '{task_id}' added to scheduler with interval {interval_seconds} seconds")
+            self._schedule(task_id, time.monotonic())
+            logger.info("Task '%s' added to scheduler with interval %s seconds", task_id, interval_seconds)
     
     def remove_task(self, task_id: str) -> bool:
         """
@@ -61,7 +77,7 @@ class Scheduler:
         with self.lock:
             if task_id in self.tasks:
                 del self.tasks[task_id]
-                logger.info(f"Task '{task_id}' removed from scheduler")
+                logger.info("Task '%s' removed from scheduler", task_id)
                 return True
             return False
     
@@ -78,47 +94,124 @@ class Scheduler:
         """
         with self.lock:
             if task_id in self.tasks:
-                self.tasks[task_id]['interval'] = interval_seconds
-                logger.info(f"Task '{task_id}' interval updated to {interval_seconds} seconds")
+                task_info = self.tasks[task_id]
+                # Move the pending run so it follows the last dispatch by the new interval
+                if task_info['next_run'] is not None:
+                    self._schedule(task_id, task_info['next_run'] - task_info['interval'] + interval_seconds)
+                task_info['interval'] = interval_seconds
+                logger.info("Task '%s' interval updated to %s seconds", task_id, interval_seconds)
                 return True
             return False
     
-    def _run_task(self, task_id: str, task_info: Dict[str, Any]) -> None:
+    def _schedule(self, task_id: str, next_run: float) -> None:
+        """
+        Set the next run time of a task and wake the scheduler thread.
+        
+        Must be called with the lock held.
+        
+        Args:
+            task_id: Unique identifier for the task.
+            next_run: Next run time on the monotonic clock.
+        """
+        self.tasks[task_id]['next_run'] = next_run
+        heapq.heappush(self._heap, (next_run, task_id))
+        self._wake.set()
+    
+    def _next_deadline(self) -> Optional[float]:
+        """
+        Get the earliest next run time, discarding stale heap entries.
+        
+        Must be called with the lock held.
+        
+        Returns:
+            The earliest next run time on the monotonic clock, or None if there are no tasks.
+        """
+        while self._heap:
+            next_run, task_id = self._heap[0]
+            task_info = self.tasks.get(task_id)
+            if task_info is not None and task_info['next_run'] == next_run:
+                return next_run
+            heapq.heappop(self._heap)
+        return None
+    
+    def _snapshot(self, task_id: str) -> Tuple[str, Callable, List, Dict, threading.Lock]:
+        """
+        Capture what is needed to run a task outside the lock.
+        
+        Task callbacks see copies of their args and kwargs taken at dispatch time.
+        
+        Must be called with the lock held.
+        
+        Args:
+            task_id: Unique identifier for the task.
+            
+        Returns:
+            Tuple of (task_id, func, args, kwargs, run_lock).
+        """
+        task_info = self.tasks[task_id]
+        return (task_id, task_info['func'], list(task_info['args']),
+                dict(task_info['kwargs']), task_info['run_lock'])
+    
+    def _run_task(self, task_id: str, func: Callable, args: List, kwargs: Dict,
+                  run_lock: threading.Lock) -> bool:
         """
         Run a task and handle any exceptions.
         
+        Must be called without the lock held, so that status queries and
+        task changes are not blocked while the task runs.
+        
         Args:
             task_id: Unique identifier for the task.
-            task_info: Task information dictionary.
+            func: Function to call.
+            args: Positional arguments to pass to the function.
+            kwargs: Keyword arguments to pass to the function.
+            run_lock: Lock serializing runs of the task.
+            
+        Returns:
+            True if the task completed successfully, False otherwise.
         """
-        try:
-            logger.info(f"Running task '{task_id}'")
-            task_info['func'](*task_info['args'], **task_info['kwargs'])
-            task_info['last_run'] = datetime.now()
-            self.last_run_times[task_id] = task_info['last_run']
-            logger.info(f"Task '{task_id}' completed successfully")
-        except Exception as e:
-            logger.exception(f"Error running task '{task_id}': {e}")
+        with run_lock:
+            try:
+                logger.info("Running task '%s'", task_id)
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.exception("Error running task '%s': %s", task_id, e)
+                return False
+        
+        with self.lock:
+            last_run = time.time()
+            if task_id in self.tasks:
+                self.tasks[task_id]['last_run'] = last_run
+            self.last_run_times[task_id] = last_run
+        logger.info("Task '%s' completed successfully", task_id)
+        return True
     
     def _scheduler_loop(self) -> None:
         """Main scheduler loop."""
         logger.info("Scheduler loop started")
         
         while self.running:
-            now = datetime.now()
-            
+            due = None
             with self.lock:
-                for task_id, task_info in self.tasks.items():
-                    if now >= task_info['next_run']:
-                        # Run the task
-                        self._run_task(task_id, task_info)
-                        
-                        # Schedule next run
-                        task_info['next_run'] = now + timedelta(seconds=task_info['interval'])
-                        logger.debug(f"Task '{task_id}' next run scheduled for {task_info['next_run']}")
+                self._wake.clear()
+                deadline = self._next_deadline()
+                now = time.monotonic()
+                
+                if deadline is not None and deadline <= now:
+                    # Schedule the next run before running the task, which
+                    # happens after the lock is released
+                    _, task_id = heapq.heappop(self._heap)
+                    interval = self.tasks[task_id]['interval']
+                    self._schedule(task_id, now + interval)
+                    logger.debug("Task '%s' next run in %s seconds", task_id, interval)
+                    due = self._snapshot(task_id)
+            
+            if due is not None:
+                self._run_task(*due)
+                continue
             
-            # Sleep for a short time to avoid high CPU usage
-            time.sleep(1)
+            # Sleep until the next deadline, or until tasks change or stop() is called
+            self._wake.wait(None if deadline is None else deadline - now)
         
         logger.info("Scheduler loop stopped")
     
@@ -135,12 +228,18 @@ class Scheduler:
         logger.info("Scheduler started")
     
     def stop(self) -> None:
-        """Stop the scheduler."""
+        """Stop the scheduler and remove its tasks."""
         if not self.running:
             logger.warning("Scheduler is not running")
             return
         
         self.running = False
+        self._wake.set()
+        
+        # Release the task functions and the state their closures hold
+        with self.lock:
+            self.tasks.clear()
+            self._heap.clear()
         if self.thread:
             self.thread.join(timeout=5)
             if self.thread.is_alive():
@@ -150,6 +249,29 @@ class Scheduler:
         
         self.thread = None
     
+    def _status(self, task_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the status dictionary of a task.
+        
+        Must be called with the lock held.
+        
+        Args:
+            task_info: Task information dictionary.
+            
+        Returns:
+            Dictionary with task status information.
+        """
+        return {
+            'interval': task_info['interval'],
+            'last_run': (
+                datetime.fromtimestamp(task_info['last_run'])
+                if task_info['last_run'] is not None else None
+            ),
+            'next_run': datetime.fromtimestamp(
+                self._wall_anchor + (task_info['next_run'] - self._monotonic_anchor)
+            )
+        }
+    
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the status of a task.
@@ -162,12 +284,7 @@ class Scheduler:
         """
         with self.lock:
             if task_id in self.tasks:
-                task_info = self.tasks[task_id]
-                return {
-                    'interval': task_info['interval'],
-                    'last_run': task_info['last_run'],
-                    'next_run': task_info['next_run']
-                }
+                return self._status(self.tasks[task_id])
             return None
     
     def get_all_task_statuses(self) -> Dict[str, Dict[str, Any]]:
@@ -177,11 +294,8 @@ class Scheduler:
         Returns:
             Dictionary mapping task IDs to status dictionaries.
         """
-        statuses = {}
         with self.lock:
-            for task_id in self.tasks:
-                statuses[task_id] = self.get_task_status(task_id)
-        return statuses
+            return {task_id: self._status(task_info) for task_id, task_info in self.tasks.items()}
     
     def run_task_now(self, task_id: str) -> bool:
         """
@@ -194,10 +308,11 @@ class Scheduler:
             True if the task was run, False if it wasn't found.
         """
         with self.lock:
-            if task_id in self.tasks:
-                task_info = self.tasks[task_id]
-                self._run_task(task_id, task_info)
-                # Reset the next run time
-                task_info['next_run'] = datetime.now() + timedelta(seconds=task_info['interval'])
-                return True
-            return False
+            if task_id not in self.tasks:
+                return False
+            # Reset the next run time
+            self._schedule(task_id, time.monotonic() + self.tasks[task_id]['interval'])
+            due = self._snapshot(task_id)
+        
+        self._run_task(*due)
+        return True
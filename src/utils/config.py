@@ -3,14 +3,118 @@ Configuration management for the Google Drive Sync application.
 """
 
 import os
+import copy
+import atexit
+import hashlib
 import yaml
 import json
 import tempfile
 from pathlib import Path
 import logging
+from functools import lru_cache
+
+# libyaml's C loader and dumper are much faster; PyYAML builds without
+# libyaml only have the pure-Python ones
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+# orjson is optional; without it JSON is validated with the json module
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    orjson = None
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Prefix of environment variables overriding configuration keys
+ENV_PREFIX = 'GDRIVE_SYNC_'
+
+# Translation table upper-casing a configuration key and replacing its dots
+_ENV_KEY_TABLE = str.maketrans(
+    'abcdefghijklmnopqrstuvwxyz.',
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ_'
+)
+
+# Memory-backed directory for the service account key file, when available
+MEMORY_TEMP_DIR = '/dev/shm'
+
+# Marks keys missing from the configuration file
+_MISSING = object()
+
+# Parsed configuration per resolved path, with the file signature it was parsed from
+_PARSE_CACHE = {}
+
+
+def _file_signature(path):
+    """
+    Get a signature that changes whenever a file is modified.
+    
+    Args:
+        path (Path): Path to the file.
+        
+    Returns:
+        tuple: (mtime_ns, size), or None if the file cannot be read.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _remove_file(path):
+    """
+    Remove a file if it still exists.
+    
+    Args:
+        path (str): Path to the file.
+    """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+@lru_cache(maxsize=None)
+def _env_key(key):
+    """
+    Get the environment variable name that overrides a configuration key.
+    
+    Args:
+        key (str): Configuration key.
+        
+    Returns:
+        str: The environment variable name.
+    """
+    return ENV_PREFIX + key.translate(_ENV_KEY_TABLE)
+
+
+def _flatten(config, prefix=''):
+    """
+    Map every dotted key of a nested configuration to its value.
+    
+    Args:
+        config (dict): Configuration dictionary.
+        prefix (str): Dotted path of the dictionary.
+        
+    Returns:
+        dict: Values keyed by dotted path, including the nested dictionaries.
+    """
+    flat = {}
+    if not isinstance(config, dict):
+        return flat
+    for k, value in config.items():
+        if not isinstance(k, str):
+            continue
+        path = prefix + k
+        flat[path] = value
+        flat.update(_flatten(value, path + '.'))
+    return flat
+
 
 class Config:
     """Configuration manager for the application."""
@@ -22,19 +126,122 @@ class Config:
         Args:
             config_path (Path or str): Path to the configuration file.
         """
-        self.config_path = Path(config_path)
+        self.config_path = config_path if isinstance(config_path, Path) else Path(config_path)
+        self._json_path = self.config_path.with_suffix('.json')
+        self._signature = self._source_signature()
+        self._digest = self._source_digest()
         self.config = self._load_config()
+        # Dotted keys are resolved once instead of walking the tree per lookup
+        self._flat = _flatten(self.config)
+        # Resolved values per (key, default), cleared by set()
+        self._get_cache = {}
+        # Names of the override variables set at startup; usually there are none
+        self._env_override_keys = frozenset(k for k in os.environ if k.startswith(ENV_PREFIX))
+        # Key file written from the environment, reused by later calls
+        self._service_account_path = None
+        # Whether set() changed the configuration since it was loaded or saved
+        self._dirty = False
         
     def _load_config(self):
         """
-        Load configuration from the YAML file.
+        Load configuration, reusing the parse of an unchanged file.
         
+        Returns:
+            dict: Configuration dictionary.
+        """
+        cache_key = str(self.config_path.resolve())
+        signature = self._signature
+        
+        cached = _PARSE_CACHE.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            return copy.deepcopy(cached[1])
+        
+        config = self._parse_config(self._json_path)
+        _PARSE_CACHE[cache_key] = (signature, copy.deepcopy(config))
+        return config
+    
+    def _source_signature(self):
+        """
+        Get the signature of the configuration files.
+        
+        Returns:
+            tuple: Signatures of the YAML file and its sibling JSON file.
+        """
+        return _file_signature(self.config_path), _file_signature(self._json_path)
+    
+    def _source_digest(self):
+        """
+        Hash the content of the configuration files.
+        
+        Returns:
+            bytes: BLAKE2b digest of the YAML file and its sibling JSON file.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for path in (self.config_path, self._json_path):
+            try:
+                digest.update(path.read_bytes())
+            except OSError:
+                pass
+            digest.update(b'\0')
+        return digest.digest()
+    
+    def reload_if_changed(self):
+        """
+        Reload the configuration if its files changed.
+        
+        Files that were only touched, without a content change, are not
+        parsed again. The configuration dictionary is updated in place, so
+        existing references to it stay valid.
+        
+        Returns:
+            bool: True if the configuration was reloaded, False otherwise.
+        """
+        signature = self._source_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        
+        digest = self._source_digest()
+        if digest == self._digest:
+            return False
+        self._digest = digest
+        
+        config = self._load_config()
+        if isinstance(self.config, dict) and isinstance(config, dict):
+            self.config.clear()
+            self.config.update(config)
+        else:
+            self.config = config
+        self._flat = _flatten(self.config)
+        self._get_cache.clear()
+        logger.info(f"Configuration reloaded from {self.config_path}")
+        return True
+    
+    def _parse_config(self, json_path):
+        """
+        Parse configuration from the YAML file.
+        
+        A sibling JSON file (e.g. config.json next to config.yaml) is used
+        instead when it is at least as new as the YAML file.
+        
+        Args:
+            json_path (Path): Path to the sibling JSON file.
+            
         Returns:
             dict: Configuration dictionary.
         """
+        try:
+            if json_path != self.config_path and json_path.stat().st_mtime >= self.config_path.stat().st_mtime:
+                with open(json_path, 'r') as f:
+                    config = json.load(f)
+                    logger.debug(f"Configuration loaded from {json_path}")
+                    return config
+        except (OSError, ValueError) as e:
+            logger.debug(f"JSON configuration cache not used: {e}")
+        
         try:
             with open(self.config_path, 'r') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=YamlLoader)
                 logger.debug(f"Configuration loaded from {self.config_path}")
                 return config
         except Exception as e:
@@ -49,6 +256,28 @@ class Config:
         Environment variables should be in the format GDRIVE_SYNC_SECTION_KEY.
         For example, GDRIVE_SYNC_GOOGLE_DRIVE_POLLING_INTERVAL for google_drive.polling_interval.
         
+        Args:
+            key (str): Configuration key.
+            default: Default value to return if key is not found.
+            
+        Returns:
+            The configuration value or default if not found.
+        """
+        try:
+            cache_key = (key, type(default), default)
+            return self._get_cache[cache_key]
+        except KeyError:
+            value = self._resolve(key, default)
+            self._get_cache[cache_key] = value
+            return value
+        except TypeError:
+            # Unhashable default
+            return self._resolve(key, default)
+    
+    def _resolve(self, key, default):
+        """
+        Look up a configuration value in the environment, then the config file.
+        
         Args:
             key (str): Configuration key.
             default: Default value to return if key is not found.
@@ -57,8 +286,10 @@ class Config:
             The configuration value or default if not found.
         """
         # Check environment variables first
-        env_key = f"GDRIVE_SYNC_{key.upper().replace('.', '_')}"
-        env_value = os.environ.get(env_key)
+        env_key = _env_key(key)
+        env_value = None
+        if env_key in self._env_override_keys:
+            env_value = os.environ.get(env_key)
         if env_value is not None:
             logger.debug(f"Using environment variable {env_key} for {key}")
             # Try to convert to appropriate type based on default value
@@ -78,16 +309,13 @@ class Config:
             return env_value
             
         # Fall back to config file
-        keys = key.split('.')
-        value = self.config
-        
-        try:
-            for k in keys:
-                value = value[k]
-            return value
-        except (KeyError, TypeError):
+        if self._flat is None:
+            self._flat = _flatten(self.config)
+        value = self._flat.get(key, _MISSING)
+        if value is _MISSING:
             logger.warning(f"Configuration key not found: {key}, using default: {default}")
             return default
+        return value
     
     def set(self, key, value):
         """
@@ -106,19 +334,39 @@ class Config:
                 config[k] = {}
             config = config[k]
         
-        # Set the value
+        # Set the value; the flat key map is rebuilt on the next lookup
         config[keys[-1]] = value
+        self._flat = None
+        self._get_cache.clear()
+        self._dirty = True
     
     def save(self):
         """Save the configuration to the YAML file."""
         try:
             with open(self.config_path, 'w') as f:
-                yaml.dump(self.config, f, default_flow_style=False)
+                yaml.dump(self.config, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
                 logger.debug(f"Configuration saved to {self.config_path}")
+            self._dirty = False
+            _PARSE_CACHE.pop(str(self.config_path.resolve()), None)
+            # The saved file matches this configuration; no reload needed
+            self._signature = self._source_signature()
+            self._digest = self._source_digest()
         except Exception as e:
             logger.error(f"Failed to save configuration: {e}")
             raise
             
+    def save_if_dirty(self):
+        """
+        Save the configuration if set() changed it since the last load or save.
+        
+        Returns:
+            bool: True if the configuration was saved, False otherwise.
+        """
+        if not self._dirty:
+            return False
+        self.save()
+        return True
+    
     def get_service_account_path(self):
         """
         Get the path to the service account key file.
@@ -129,22 +377,33 @@ class Config:
         Returns:
             Path: Path to the service account key file.
         """
+        # Reuse the key file written by an earlier call
+        if self._service_account_path is not None and self._service_account_path.exists():
+            return self._service_account_path
+        
         # Check if service account JSON is provided as an environment variable
         env_key = "GDRIVE_SYNC_GOOGLE_DRIVE_SERVICE_ACCOUNT_FILE"
         service_account_json = os.environ.get(env_key)
         
         if service_account_json:
             try:
-                # Parse the JSON to validate it
-                json_data = json.loads(service_account_json)
+                # Parse the JSON to validate it; orjson's decode error
+                # subclasses json.JSONDecodeError
+                _json_loads(service_account_json)
                 
-                # Create a temporary file for the service account key
-                fd, temp_path = tempfile.mkstemp(suffix='.json')
-                with os.fdopen(fd, 'w') as temp_file:
-                    json.dump(json_data, temp_file)
+                # Create a temporary file for the service account key, removed at
+                # exit; kept in memory rather than on disk where possible
+                temp_dir = MEMORY_TEMP_DIR if os.path.isdir(MEMORY_TEMP_DIR) else None
+                fd, temp_path = tempfile.mkstemp(suffix='.json', dir=temp_dir)
+                try:
+                    os.write(fd, service_account_json.encode('utf-8'))
+                finally:
+                    os.close(fd)
+                atexit.register(_remove_file, temp_path)
                 
                 logger.info(f"Created temporary service account key file at {temp_path}")
-                return Path(temp_path)
+                self._service_account_path = Path(temp_path)
+                return self._service_account_path
             except json.JSONDecodeError as e:
                 logger.error(f"Invalid service account JSON in environment variable: {e}")
         
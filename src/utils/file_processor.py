@@ -5,16 +5,50 @@ This module provides functionality to process different file types.
 """
 
 import os
+import stat
 import logging
 import mimetypes
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union, Tuple
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterator
 
 logger = logging.getLogger(__name__)
 
 # Type definitions
 PathLike = Union[str, Path]
 
+# Non-text/* MIME types that hold text
+TEXT_MIME_TYPES = frozenset({
+    'application/json',
+    'application/xml',
+    'application/javascript',
+    'application/x-yaml'
+})
+
+# Load the system MIME database once at import time, with Markdown added
+mimetypes.init()
+mimetypes.add_type('text/markdown', '.md')
+mimetypes.add_type('text/markdown', '.markdown')
+
+# Extension map snapshot, so lookups are a single dict access
+EXT_TO_MIME = dict(mimetypes.types_map)
+TEXT_SUFFIXES = frozenset(
+    ext for ext, mime_type in EXT_TO_MIME.items()
+    if mime_type.startswith('text/') or mime_type in TEXT_MIME_TYPES
+)
+
+
+def _suffix(file_path: PathLike) -> str:
+    """
+    Get the lower-cased extension of a path without building a Path.
+    
+    Args:
+        file_path: Path to the file.
+        
+    Returns:
+        Lower-cased extension, including the leading dot, or an empty string.
+    """
+    return os.path.splitext(os.fspath(file_path))[1].lower()
+
 
 class FileProcessor:
     """Processes different file types."""
@@ -45,12 +79,9 @@ class FileProcessor:
     
     def __init__(self):
         """Initialize the file processor."""
-        # Initialize mimetypes
-        mimetypes.init()
-        
-        # Add additional MIME types
-        mimetypes.add_type('text/markdown', '.md')
-        mimetypes.add_type('text/markdown', '.markdown')
+        # The MIME tables are built once at import and shared
+        self._ext_to_mime = EXT_TO_MIME
+        self._text_suffixes = TEXT_SUFFIXES
     
     def get_mime_type(self, file_path: PathLike) -> str:
         """
@@ -62,9 +93,7 @@ class FileProcessor:
         Returns:
             MIME type of the file.
         """
-        file_path = Path(file_path)
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type or 'application/octet-stream'
+        return self._ext_to_mime.get(_suffix(file_path), 'application/octet-stream')
     
     def is_text_file(self, file_path: PathLike) -> bool:
         """
@@ -76,13 +105,7 @@ class FileProcessor:
         Returns:
             True if the file is a text file, False otherwise.
         """
-        mime_type = self.get_mime_type(file_path)
-        return mime_type.startswith('text/') or mime_type in [
-            'application/json', 
-            'application/xml',
-            'application/javascript',
-            'application/x-yaml'
-        ]
+        return _suffix(file_path) in self._text_suffixes
     
     def is_binary_file(self, file_path: PathLike) -> bool:
         """
@@ -96,12 +119,14 @@ class FileProcessor:
         """
         return not self.is_text_file(file_path)
     
-    def get_file_info(self, file_path: PathLike) -> Dict[str, Any]:
+    def get_file_info(self, file_path: PathLike,
+                      stat_result: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
         Get information about a file.
         
         Args:
             file_path: Path to the file.
+            stat_result: Result of a previous stat of the file, to avoid another one.
             
         Returns:
             Dictionary with file information.
@@ -109,17 +134,8 @@ class FileProcessor:
         file_path = Path(file_path)
         
         try:
-            stat = file_path.stat()
-            
-            return {
-                'name': file_path.name,
-                'path': str(file_path),
-                'size': stat.st_size,
-                'modified_time': stat.st_mtime,
-                'mime_type': self.get_mime_type(file_path),
-                'extension': file_path.suffix.lower(),
-                'is_text': self.is_text_file(file_path)
-            }
+            st = stat_result or os.stat(file_path)
+            return self._build_info(file_path.name, str(file_path), st)
         except Exception as e:
             logger.error(f"Error getting file info for {file_path}: {e}")
             return {
@@ -128,6 +144,53 @@ class FileProcessor:
                 'error': str(e)
             }
     
+    def iter_file_infos(self, directory: PathLike) -> Iterator[Dict[str, Any]]:
+        """
+        Get information about the files in a directory.
+        
+        The directory is read with os.scandir, so entries that are not
+        regular files are skipped without a stat call.
+        
+        Args:
+            directory: Path to the directory.
+            
+        Yields:
+            Dictionary with file information for each regular file.
+        """
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            yield self._build_info(entry.name, entry.path, entry.stat())
+                    except OSError as e:
+                        logger.error(f"Error getting file info for {entry.path}: {e}")
+        except OSError as e:
+            logger.error(f"Error reading directory {directory}: {e}")
+    
+    def _build_info(self, name: str, path: str, st: os.stat_result) -> Dict[str, Any]:
+        """
+        Build the information dictionary of a file.
+        
+        Args:
+            name: File name.
+            path: Path to the file.
+            st: Result of a stat of the file.
+            
+        Returns:
+            Dictionary with file information.
+        """
+        extension = _suffix(name)
+        return {
+            'name': name,
+            'path': path,
+            'size': st.st_size,
+            'modified_time': st.st_mtime,
+            'mime_type': self._ext_to_mime.get(extension, 'application/octet-stream'),
+            'extension': extension,
+            'is_text': extension in self._text_suffixes
+        }
+    
     def get_export_format(self, mime_type: str) -> Optional[Dict[str, str]]:
         """
         Get the export format for a Google Workspace file.
@@ -152,30 +215,32 @@ class FileProcessor:
         """
         return mime_type.startswith('application/vnd.google-apps.')
     
-    def validate_file(self, file_path: PathLike, max_size_mb: float = 100) -> Tuple[bool, Optional[str]]:
+    def validate_file(self, file_path: PathLike, max_size_mb: float = 100,
+                      stat_result: Optional[os.stat_result] = None) -> Tuple[bool, Optional[str]]:
         """
         Validate a file.
         
         Args:
             file_path: Path to the file.
             max_size_mb: Maximum file size in megabytes.
+            stat_result: Result of a previous stat of the file, to avoid another one.
             
         Returns:
             Tuple of (is_valid, error_message).
         """
-        file_path = Path(file_path)
-        
-        # Check if file exists
-        if not file_path.exists():
+        # Check if file exists; one stat answers all the checks below
+        try:
+            st = stat_result or os.stat(file_path)
+        except OSError:
             return False, f"File does not exist: {file_path}"
         
         # Check if file is readable
-        if not os.access(file_path, os.R_OK):
+        if not self._is_readable(file_path, st):
             return False, f"File is not readable: {file_path}"
         
         # Check file size
         max_size_bytes = max_size_mb * 1024 * 1024
-        file_size = file_path.stat().st_size
+        file_size = st.st_size
         
         if file_size > max_size_bytes:
             return False, f"File is too large: {file_size / (1024 * 1024):.2f} MB (max: {max_size_mb} MB)"
@@ -185,3 +250,21 @@ class FileProcessor:
             return False, f"File is empty: {file_path}"
         
         return True, None
+    
+    @staticmethod
+    def _is_readable(file_path: PathLike, st: os.stat_result) -> bool:
+        """
+        Check if a file is readable by this process.
+        
+        Args:
+            file_path: Path to the file.
+            st: Result of a stat of the file.
+            
+        Returns:
+            True if the file is readable, False otherwise.
+        """
+        # Files we own, such as our own downloads, are decided by the owner
+        # bits without another system call
+        if hasattr(os, 'getuid') and st.st_uid == os.getuid() and os.getuid() != 0:
+            return bool(st.st_mode & stat.S_IRUSR)
+        return os.access(file_path, os.R_OK)
@@ -3,9 +3,18 @@ Logging configuration for the Google Drive Sync application.
 """
 
 import os
+import queue
+import atexit
 import logging
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+# (level, log file) of the current setup and the listener writing its records
+_configured_key = None
+_listener = None
+
+# Log directories already created by this process
+_ensured_dirs = set()
 
 
 def setup_logger(log_level='INFO', log_file=None):
@@ -13,21 +22,38 @@ def setup_logger(log_level='INFO', log_file=None):
     Set up the application logger.
     
     Args:
-        log_level (str): Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL).
+        log_level (int or str): Logging level, either a logging constant or its
+                               name (DEBUG, INFO, WARNING, ERROR, CRITICAL).
         log_file (str, optional): Path to the log file. If None, logs will be stored
                                  in the default location.
     
     Returns:
         logging.Logger: Configured logger instance.
     """
+    global _configured_key, _listener
+    
     # Convert string log level to logging constant
-    numeric_level = getattr(logging, log_level.upper(), logging.INFO)
+    if isinstance(log_level, int):
+        numeric_level = log_level
+    else:
+        numeric_level = getattr(logging, log_level.upper(), logging.INFO)
     
     # Create logger
     logger = logging.getLogger()
+    
+    # Repeated calls with the same settings keep the existing setup
+    key = (numeric_level, str(log_file) if log_file is not None else None)
+    if key == _configured_key:
+        return logger
+    
     logger.setLevel(numeric_level)
     
-    # Clear existing handlers
+    # Stop the previous listener and clear existing handlers
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
     
@@ -41,17 +67,16 @@ def setup_logger(log_level='INFO', log_file=None):
     )
     console_handler.setFormatter(formatter)
     
-    # Add console handler to logger
-    logger.addHandler(console_handler)
-    
     # If log file is specified or use default
     if log_file is None:
-        log_dir = Path(__file__).resolve().parent.parent.parent / 'logs'
-        log_dir.mkdir(exist_ok=True)
-        log_file = log_dir / 'gdrive_sync.log'
+        log_file = Path(__file__).resolve().parent.parent.parent / 'logs' / 'gdrive_sync.log'
     else:
         log_file = Path(log_file)
-        log_file.parent.mkdir(exist_ok=True)
+    
+    log_dir = str(log_file.parent)
+    if log_dir not in _ensured_dirs:
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        _ensured_dirs.add(log_dir)
     
     # Create file handler
     file_handler = RotatingFileHandler(
@@ -62,10 +87,24 @@ def setup_logger(log_level='INFO', log_file=None):
     file_handler.setLevel(numeric_level)
     file_handler.setFormatter(formatter)
     
-    # Add file handler to logger
-    logger.addHandler(file_handler)
+    # Log calls only enqueue records; a background thread does the console
+    # and file I/O, including rotation
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(QueueHandler(log_queue))
+    _configured_key = key
     
-    logger.info(f"Logger initialized with level {log_level}")
+    logger.info(f"Logger initialized with level {logging.getLevelName(numeric_level)}")
     logger.info(f"Log file: {log_file}")
     
     return logger
+
+
+def _stop_listener():
+    """Write out the queued log records at interpreter exit."""
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
@@ -0,0 +1,47 @@
+"""
+Rate limiting utilities.
+
+This module provides a thread-safe token bucket for pacing API requests.
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+    
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize the token bucket.
+        
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum number of tokens, i.e. the largest allowed burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: int = 1) -> None:
+        """
+        Block until the requested number of tokens is available, then take them.
+        
+        Args:
+            tokens: Number of tokens to take.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                
+                wait = (tokens - self._tokens) / self.rate
+            
+            time.sleep(wait)
@@ -7,4 +7,4 @@ pwd
 ls -la src/
 
 # Run the application
-python src/main.py
+python -m src.main
@@ -96,15 +96,16 @@ def test_download_system():
             download_path = download_manager.download_file(file)
             
             if download_path:
-                # Process the file
-                file_info = file_processor.get_file_info(download_path)
+                # Process the file; one stat serves both the info and the validation
+                stat_result = os.stat(download_path)
+                file_info = file_processor.get_file_info(download_path, stat_result)
                 print(f"   Downloaded to: {download_path}")
                 print(f"   File size: {file_info['size']} bytes")
                 print(f"   MIME type: {file_info['mime_type']}")
                 print(f"   Is text file: {file_info['is_text']}")
                 
                 # Validate the file
-                is_valid, error = file_processor.validate_file(download_path)
+                is_valid, error = file_processor.validate_file(download_path, stat_result=stat_result)
                 if is_valid:
                     print(f"   File validation: PASSED")
                 else:
@@ -112,6 +113,11 @@ def test_download_system():
             else:
                 print(f"   Failed to download file")
         
+        # List the download directory in one pass
+        print("\nDownload directory contents:")
+        for file_info in file_processor.iter_file_infos(temp_download_dir):
+            print(f"   {file_info['name']}: {file_info['size']} bytes, {file_info['mime_type']}")
+        
         # Test getting a downloaded file
         if test_files:
             file_id = test_files[0]['id']
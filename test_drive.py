@@ -6,16 +6,112 @@ Counts files in each folder and subfolder.
 
 import os
 import sys
+import json
 import tempfile
 from pathlib import Path
-from collections import defaultdict
 
 # Add the parent directory to sys.path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from src.utils.config import Config
 from src.utils.logger import setup_logger
-from src.drive.service_drive_client import ServiceDriveClient
+from src.drive.service_drive_client import (
+    ServiceDriveClient, LIST_BATCH_SIZE, TREE_FIELDS, FOLDER_MIME_TYPE
+)
+
+# Folder trees counted by earlier runs, one JSON file per root folder
+TREE_CACHE_DIR = Path.home() / '.cache' / 'gdrive-sync'
+
+
+class FolderRecord:
+    """Name, path and file IDs of a traversed folder."""
+    
+    __slots__ = ('name', 'path', 'file_ids')
+    
+    def __init__(self, name, path, file_ids=()):
+        self.name = name
+        self.path = path
+        self.file_ids = file_ids
+    
+    @property
+    def count(self):
+        """Number of files directly in the folder."""
+        return len(self.file_ids)
+
+
+def load_tree_cache(drive_client, root_folder_id):
+    """
+    Load the folder tree counted by an earlier run, if it is still current.
+    
+    The cached tree is current if no change since it was counted touches
+    the root folder, its subfolders or a file that was in them. A change
+    only lists a file's current parents, so a file moved out of the tree
+    is recognized by its ID.
+    
+    Args:
+        drive_client: The Google Drive client
+        root_folder_id: The ID of the root folder
+        
+    Returns:
+        tuple: The cached count_files_in_folders result, or None
+    """
+    cache_file = TREE_CACHE_DIR / f"tree_{root_folder_id}.json"
+    try:
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if 'records' not in cached:
+        # Written in an older format
+        return None
+    
+    changes, new_token = drive_client.list_changes(cached['token'])
+    if changes is None:
+        return None
+    
+    records = {folder_id: FolderRecord(*fields) for folder_id, fields in cached['records'].items()}
+    folder_ids = records.keys()
+    known_ids = set(folder_ids)
+    for record in records.values():
+        known_ids.update(record.file_ids)
+    
+    for change in changes:
+        # Files in the tree, including ones moved out or removed since
+        if change['fileId'] in known_ids:
+            return None
+        # Files added to a folder of the tree
+        file = change.get('file') or {}
+        if not folder_ids.isdisjoint(file.get('parents', [])):
+            return None
+    
+    tree = (records, cached['root_files'])
+    save_tree_cache(root_folder_id, new_token, tree)
+    return tree
+
+
+def save_tree_cache(root_folder_id, token, tree):
+    """
+    Save a counted folder tree for later runs.
+    
+    Args:
+        root_folder_id: The ID of the root folder
+        token: The changes start page token from before the tree was counted
+        tree: The count_files_in_folders result
+    """
+    if token is None:
+        return
+    
+    records, root_files = tree
+    TREE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(TREE_CACHE_DIR / f"tree_{root_folder_id}.json", 'w') as f:
+        json.dump({
+            'token': token,
+            'records': {
+                folder_id: (record.name, record.path, record.file_ids)
+                for folder_id, record in records.items()
+            },
+            'root_files': root_files
+        }, f)
 
 
 def count_files_in_folders(drive_client, root_folder_id):
@@ -27,45 +123,45 @@ def count_files_in_folders(drive_client, root_folder_id):
         root_folder_id: The ID of the root folder
         
     Returns:
-        dict: A dictionary with folder IDs as keys and file counts as values
-        dict: A dictionary with folder IDs as keys and folder names as values
+        dict: A dictionary with folder IDs as keys and FolderRecords as values
+        list: The files directly in the root folder
     """
-    # Initialize dictionaries to store counts and folder names
-    file_counts = defaultdict(int)
-    folder_names = {}
-    folder_paths = {}
+    # One record per folder, holding its name, path and file IDs
+    records = {}
+    root_files = []
     
-    # Queue for BFS traversal
-    queue = [(root_folder_id, "Root", "/")]
+    # Depth-first traversal; the stack keeps the frontier proportional to the
+    # tree depth, and each wave of up to LIST_BATCH_SIZE folders is listed
+    # with one batch HTTP request
+    stack = [(root_folder_id, "Root", "/")]
     processed = set()
     
-    while queue:
-        current_id, current_name, current_path = queue.pop(0)
+    while stack:
+        # Take the next wave, skipping folders reached through more than one parent
+        wave = []
+        while stack and len(wave) < LIST_BATCH_SIZE:
+            current_id, current_name, current_path = stack.pop()
+            if current_id in processed:
+                continue
+            processed.add(current_id)
+            record = records[current_id] = FolderRecord(current_name, current_path)
+            wave.append((current_id, record))
         
-        if current_id in processed:
-            continue
-            
-        processed.add(current_id)
-        folder_names[current_id] = current_name
-        folder_paths[current_id] = current_path
+        # Get files in the folders of this wave
+        listings = drive_client.list_files_batch([current_id for current_id, _ in wave], fields=TREE_FIELDS)
         
-        # Get files in the current folder
-        files, _ = drive_client.list_files(current_id)
-        
-        # Count files and add subfolders to the queue
-        file_count = 0
-        for file in files:
-            if file['mimeType'] == 'application/vnd.google-apps.folder':
-                # It's a folder, add to queue
-                subfolder_path = f"{current_path}{file['name']}/"
-                queue.append((file['id'], file['name'], subfolder_path))
-            else:
-                # It's a file, count it
-                file_count += 1
-        
-        file_counts[current_id] = file_count
+        # Count files and push the subfolders onto the stack
+        for current_id, record in wave:
+            files = listings[current_id]
+            subfolders = [f for f in files if f['mimeType'] == FOLDER_MIME_TYPE]
+            stack.extend((f['id'], f['name'], f"{record.path}{f['name']}/") for f in subfolders)
+            
+            folder_files = [f for f in files if f['mimeType'] != FOLDER_MIME_TYPE]
+            record.file_ids = [f['id'] for f in folder_files]
+            if current_id == root_folder_id:
+                root_files = folder_files
     
-    return file_counts, folder_names, folder_paths
+    return records, root_files
 
 
 def test_drive():
@@ -96,15 +192,23 @@ def test_drive():
     root_folder_id = config.get('google_drive.folder_id')
     print(f"\nCounting files in folder: {root_folder_id} and all subfolders...")
     
-    # Count files in all folders
-    file_counts, folder_names, folder_paths = count_files_in_folders(drive_client, root_folder_id)
+    # Count files in all folders, unless nothing changed since the last run
+    tree = load_tree_cache(drive_client, root_folder_id)
+    if tree is None:
+        start_token = drive_client.get_start_page_token()
+        tree = count_files_in_folders(drive_client, root_folder_id)
+        save_tree_cache(root_folder_id, start_token, tree)
+    else:
+        print("Using the folder tree cached by the last run.")
+    records, root_files = tree
     
-    if not file_counts:
+    if not records:
         print("No folders found.")
         return
     
-    # Sort folders by path for a hierarchical display
-    sorted_folders = sorted(folder_paths.items(), key=lambda x: x[1])
+    # Sort folders by path components for a hierarchical display; each
+    # folder then comes right before its subfolders
+    sorted_records = sorted(records.values(), key=lambda record: record.path.split('/'))
     
     # Display file counts for each folder
     print("\nFile counts by folder:")
@@ -113,31 +217,31 @@ def test_drive():
     print("-" * 80)
     
     total_files = 0
-    total_folders = len(file_counts)
+    total_folders = len(records)
     
-    for folder_id, path in sorted_folders:
-        folder_name = folder_names[folder_id]
-        file_count = file_counts[folder_id]
+    # Collect the rows and write them in one call
+    lines = []
+    for record in sorted_records:
+        file_count = record.count
         total_files += file_count
         
         # Format the display path
-        display_path = path
+        display_path = record.path
         if display_path == "/":
             display_path = "/ (Root)"
             
-        print(f"{display_path:<50} {file_count:>10}")
+        lines.append(f"{display_path:<50} {file_count:>10}\n")
+    
+    sys.stdout.write("".join(lines))
     
     print("-" * 80)
     print(f"{'Total':<50} {total_files:>10}")
     print(f"Total folders: {total_folders}")
     
-    # Test downloading a sample file
-    files, _ = drive_client.list_files(root_folder_id)
-    non_folder_files = [f for f in files if f['mimeType'] != 'application/vnd.google-apps.folder']
-    
-    if non_folder_files:
+    # Test downloading a sample file, taken from the root listing made above
+    if root_files:
         print("\nTesting file download...")
-        file_to_download = non_folder_files[0]
+        file_to_download = root_files[0]
         print(f"Downloading file: {file_to_download['name']}")
         
         with tempfile.TemporaryDirectory() as temp_dir: